@@ -243,10 +243,27 @@ def _should_run_schedule(schedule, now: datetime) -> bool:
     return False
 
 
+def _prune_activity_logs():
+    """Apply the activity log retention setting (0 disables pruning)."""
+    try:
+        retention_days = int(db.get_setting('activity_log_retention_days', '90') or 0)
+        if retention_days > 0:
+            removed = db.prune_activity_logs(retention_days)
+            if removed:
+                logger.info("Pruned %s activity log entries older than %s days", removed, retention_days)
+    except Exception as exc:
+        logger.error("Activity log pruning failed: %s", exc)
+
+
 def schedule_runner_loop():
     """Background schedule runner that starts patrols based on schedules."""
     logger.info("Schedule runner started")
+    last_prune_date = None
     while True:
+        if last_prune_date != datetime.now().date():
+            _prune_activity_logs()
+            last_prune_date = datetime.now().date()
+
         try:
             schedules = db.get_all_schedules(enabled_only=True)
             now = datetime.now()
@@ -1641,7 +1658,7 @@ def settings_page():
 @login_required
 def logs():
     """Activity logs page"""
-    logs_list = db.get_activity_logs(limit=500)
+    logs_list = db.get_activity_log_rows(limit=500)
     robots_list = db.get_all_robots()
     return render_template('logs.html', logs=logs_list, robots=robots_list,
                          username=session.get('username'))
@@ -6,170 +6,364 @@ Load configuration from environment variables or use defaults.
 """
 
 import os
-from datetime import timedelta
+import secrets
+import sys
+from dataclasses import dataclass, field, fields, replace
+from functools import cache
+from importlib import import_module
+from importlib.util import find_spec
+from types import MappingProxyType
+from typing import Any, FrozenSet, Mapping, NamedTuple, Optional, Tuple, Union
 
+# Snapshot of the process environment, taken once at import
+_ENV = dict(os.environ)
 
+_TRUE = frozenset({'1', 'true', 'True', 'TRUE', 'yes', 'Yes', 'YES', 'on', 'On', 'ON'})
+
+
+def _get(key, default=None, cast=None):
+    """Read a value from the environment snapshot, falling back to default when unset or empty"""
+    value = _ENV.get(key, default)
+    if value == '':
+        # Blank entries (e.g. "MQTT_USERNAME=" in .env) count as unset
+        return default
+    if cast:
+        return cast(value)
+    if isinstance(value, str) and len(value) <= 32:
+        # Short values (hosts, levels, modes) are compared often; intern them
+        return sys.intern(value)
+    return value
+
+
+def _get_bool(key):
+    """Read a boolean flag from the environment snapshot (unset means False)"""
+    return _ENV.get(key, '') in _TRUE
+
+
+def _get_list(key, default=''):
+    """Read a comma-separated value as a tuple of non-empty, stripped items"""
+    raw = _get(key, default)
+    return tuple(item.strip() for item in raw.split(',') if item.strip())
+
+
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def _parse_limit(limit):
+    """Parse a rate-limit string like "200 per day, 50 per hour" into ((count, seconds), ...)"""
+    parsed = []
+    for part in limit.split(','):
+        count, _, unit = part.strip().split(' ')
+        parsed.append((int(count), _PERIODS[unit.rstrip('s')]))
+    return tuple(parsed)
+
+
+class _Timings(NamedTuple):
+    """Time-based settings in one place; values are seconds unless suffixed _ms"""
+    yolo_timeout: int
+    ping_timeout: int
+    ping_interval: int
+    session_lifetime: int
+    position_throttle_ms: int
+    violation_cooldown: int
+
+
+# Values shared by several profiles, derived from the snapshot once
+_REDIS_URL = _get('REDIS_URL')
+_CORS_ORIGINS = _get_list('CORS_ORIGINS', 'https://temi-control.example.com')
+
+
+def _env(key, default=None, cast=None):
+    """Field default resolved from the environment when the config is instantiated"""
+    return field(default_factory=lambda: _get(key, default, cast))
+
+
+def _env_bool(key):
+    """Boolean field default resolved from the environment when the config is instantiated"""
+    return field(default_factory=lambda: _get_bool(key))
+
+
+def _default_async_mode():
+    """Prefer a green-thread Socket.IO driver when one is installed, else threads"""
+    for mode in ('eventlet', 'gevent'):
+        if find_spec(mode) is not None:
+            return sys.intern(mode)
+    return sys.intern('threading')
+
+
+def _secret_key():
+    """
+    Resolve SECRET_KEY from the live environment
+
+    Read at first config resolution rather than from the import-time snapshot,
+    so keys injected after import (e.g. from a secrets manager) are picked up.
+    Without one, a random per-process key is used instead of a shared default.
+    """
+    return os.environ.get('SECRET_KEY') or secrets.token_hex(32)
+
+
+# Slotted dataclasses need Python 3.10+; older interpreters fall back to a __dict__
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(frozen=True, **_DATACLASS_OPTIONS)
 class Config:
     """Base configuration"""
 
     # Flask settings
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-CHANGE-IN-PROD'
-    DEBUG = False
+    SECRET_KEY: str = field(default_factory=_secret_key, repr=False)
+    DEBUG: bool = False
+    TESTING: bool = False
 
     # Security
-    SESSION_COOKIE_SECURE = True
-    SESSION_COOKIE_HTTPONLY = True
-    SESSION_COOKIE_SAMESITE = 'Lax'
-    PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
+    SESSION_COOKIE_SECURE: bool = True
+    SESSION_COOKIE_HTTPONLY: bool = True
+    SESSION_COOKIE_SAMESITE: str = sys.intern('Lax')
+    PREFERRED_URL_SCHEME: str = 'http'
+    CORS_ORIGINS: Union[None, str, Tuple[str, ...]] = None
+    PERMANENT_SESSION_LIFETIME: int = 24 * 60 * 60  # seconds
 
     # Database
-    DATABASE_PATH = os.environ.get('DATABASE_PATH') or './temi_control.db'
+    DATABASE_PATH: str = _env('DATABASE_PATH', './temi_control.db')
 
     # MQTT Broker Configuration
-    MQTT_BROKER = os.environ.get('MQTT_BROKER') or 'localhost'
-    MQTT_PORT = int(os.environ.get('MQTT_PORT') or 1883)
-    MQTT_USERNAME = os.environ.get('MQTT_USERNAME') or None
-    MQTT_PASSWORD = os.environ.get('MQTT_PASSWORD') or None
-    MQTT_USE_TLS = os.environ.get('MQTT_USE_TLS', 'false').lower() == 'true'
+    MQTT_BROKER: str = _env('MQTT_BROKER', 'localhost')
+    MQTT_PORT: int = _env('MQTT_PORT', 1883, int)
+    MQTT_USERNAME: Optional[str] = _env('MQTT_USERNAME')
+    MQTT_PASSWORD: Optional[str] = _env('MQTT_PASSWORD')
+    MQTT_USE_TLS: bool = _env_bool('MQTT_USE_TLS')
 
     # MQTT Topic Configuration
-    MQTT_BASE_TOPIC = 'temi'
-    YOLO_DETECTION_TOPIC = 'yolo/detection'
-    YOLO_MESSAGE_TIMEOUT = 30  # seconds
+    MQTT_BASE_TOPIC: str = sys.intern('temi')
+    YOLO_DETECTION_TOPIC: str = sys.intern('yolo/detection')
+    YOLO_MESSAGE_TIMEOUT: int = 30  # seconds
 
     # Position Tracking
-    POSITION_HISTORY_MAX = 500  # maximum positions per robot
-    POSITION_UPDATE_THROTTLE = 500  # milliseconds between updates
+    POSITION_HISTORY_MAX: int = 500  # maximum positions per robot
+    POSITION_UPDATE_THROTTLE: int = 500  # milliseconds between updates
 
     # Logging
-    LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
-    LOG_FILE = os.environ.get('LOG_FILE') or './logs/temi_control.log'
+    LOG_LEVEL: str = _env('LOG_LEVEL', 'INFO')
+    LOG_FILE: str = _env('LOG_FILE', './logs/temi_control.log')
+    LOG_DIR: str = field(init=False, compare=False)
 
     # Performance
-    SOCKETIO_ASYNC_MODE = 'threading'
-    SOCKETIO_PING_TIMEOUT = 60
-    SOCKETIO_PING_INTERVAL = 25
-    SOCKETIO_MESSAGE_QUEUE = None  # Use Redis in production for scaling
+    SOCKETIO_ASYNC_MODE: str = field(default_factory=_default_async_mode)
+    SOCKETIO_PING_TIMEOUT: int = 60
+    SOCKETIO_PING_INTERVAL: int = 25
+    SOCKETIO_MESSAGE_QUEUE: Optional[str] = None  # Use Redis in production for scaling
+
+    # Cache
+    CACHE_TYPE: Optional[str] = None
+    CACHE_REDIS_URL: Optional[str] = None
 
     # API Rate Limiting
-    RATELIMIT_ENABLED = True
-    RATELIMIT_DEFAULT = "200 per day, 50 per hour"
-    RATELIMIT_LOGIN = "5 per minute"
+    RATELIMIT_ENABLED: bool = True
+    RATELIMIT_DEFAULT: str = "200 per day, 50 per hour"
+    RATELIMIT_LOGIN: str = "5 per minute"
+    RATELIMIT_DEFAULT_PARSED: Tuple[Tuple[int, int], ...] = field(init=False, compare=False)
+    RATELIMIT_LOGIN_PARSED: Tuple[Tuple[int, int], ...] = field(init=False, compare=False)
 
     # File Upload
-    MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # 10 MB
-    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or './uploads'
-    ALLOWED_EXTENSIONS = {'csv', 'json', 'txt'}
+    MAX_CONTENT_LENGTH: int = 10 * 1024 * 1024  # 10 MB
+    UPLOAD_FOLDER: str = _env('UPLOAD_FOLDER', './uploads')
+    ALLOWED_EXTENSIONS: FrozenSet[str] = frozenset(map(sys.intern, ('csv', 'json', 'txt')))
 
     # Email Configuration (for alerts)
-    EMAIL_ENABLED = os.environ.get('EMAIL_ENABLED', 'false').lower() == 'true'
-    SMTP_SERVER = os.environ.get('SMTP_SERVER') or 'smtp.gmail.com'
-    SMTP_PORT = int(os.environ.get('SMTP_PORT') or 587)
-    SMTP_USERNAME = os.environ.get('SMTP_USERNAME') or None
-    SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD') or None
-    ALERT_EMAIL_RECIPIENTS = os.environ.get('ALERT_EMAIL_RECIPIENTS', '').split(',')
+    EMAIL_ENABLED: bool = _env_bool('EMAIL_ENABLED')
+    SMTP_SERVER: str = _env('SMTP_SERVER', 'smtp.gmail.com')
+    SMTP_PORT: int = _env('SMTP_PORT', 587, int)
+    SMTP_USERNAME: Optional[str] = _env('SMTP_USERNAME')
+    SMTP_PASSWORD: Optional[str] = _env('SMTP_PASSWORD')
+    ALERT_EMAIL_RECIPIENTS: Tuple[str, ...] = field(
+        default_factory=lambda: _get_list('ALERT_EMAIL_RECIPIENTS'))
 
     # SMS Configuration (for alerts)
-    SMS_ENABLED = os.environ.get('SMS_ENABLED', 'false').lower() == 'true'
-    TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID') or None
-    TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN') or None
-    TWILIO_FROM_NUMBER = os.environ.get('TWILIO_FROM_NUMBER') or None
+    SMS_ENABLED: bool = _env_bool('SMS_ENABLED')
+    TWILIO_ACCOUNT_SID: Optional[str] = _env('TWILIO_ACCOUNT_SID')
+    TWILIO_AUTH_TOKEN: Optional[str] = _env('TWILIO_AUTH_TOKEN')
+    TWILIO_FROM_NUMBER: Optional[str] = _env('TWILIO_FROM_NUMBER')
 
     # Violation Alert Settings
-    VIOLATION_HIGH_SEVERITY_THRESHOLD = 5  # violations within 60 seconds
-    VIOLATION_ALERT_COOLDOWN = 300  # seconds (don't alert more than once per 5 min)
+    VIOLATION_HIGH_SEVERITY_THRESHOLD: int = 5  # violations within 60 seconds
+    VIOLATION_ALERT_COOLDOWN: int = 300  # seconds (don't alert more than once per 5 min)
 
     # Feature Flags
-    ENABLE_YOLO_MONITORING = True
-    ENABLE_POSITION_TRACKING = True
-    ENABLE_SCHEDULED_PATROLS = True
-    ENABLE_ROUTE_OPTIMIZATION = True
-
-    @staticmethod
-    def init_app(app):
+    ENABLE_YOLO_MONITORING: bool = True
+    ENABLE_POSITION_TRACKING: bool = True
+    ENABLE_SCHEDULED_PATROLS: bool = True
+    ENABLE_ROUTE_OPTIMIZATION: bool = True
+
+    TIMINGS: _Timings = field(init=False, compare=False)
+
+    _hash: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Resolve paths once so init_app and log handlers don't redo it per worker
+        object.__setattr__(self, 'LOG_FILE', os.path.abspath(self.LOG_FILE))
+        object.__setattr__(self, 'LOG_DIR', os.path.dirname(self.LOG_FILE))
+        object.__setattr__(self, 'UPLOAD_FOLDER', os.path.abspath(self.UPLOAD_FOLDER))
+        object.__setattr__(self, 'RATELIMIT_DEFAULT_PARSED', _parse_limit(self.RATELIMIT_DEFAULT))
+        object.__setattr__(self, 'RATELIMIT_LOGIN_PARSED', _parse_limit(self.RATELIMIT_LOGIN))
+        object.__setattr__(self, 'TIMINGS', _Timings(
+            yolo_timeout=self.YOLO_MESSAGE_TIMEOUT,
+            ping_timeout=self.SOCKETIO_PING_TIMEOUT,
+            ping_interval=self.SOCKETIO_PING_INTERVAL,
+            session_lifetime=self.PERMANENT_SESSION_LIFETIME,
+            position_throttle_ms=self.POSITION_UPDATE_THROTTLE,
+            violation_cooldown=self.VIOLATION_ALERT_COOLDOWN,
+        ))
+        values = tuple(getattr(self, f.name) for f in fields(self) if f.compare)
+        object.__setattr__(self, '_hash', hash(values))
+
+    def __hash__(self):
+        return self._hash
+
+    def init_app(self, app):
         """Initialize application with config"""
         # Create upload folder if it doesn't exist
-        os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
+        if not os.path.isdir(self.UPLOAD_FOLDER):
+            os.makedirs(self.UPLOAD_FOLDER, exist_ok=True)
 
         # Create log folder if it doesn't exist
-        log_dir = os.path.dirname(Config.LOG_FILE)
-        if log_dir:
-            os.makedirs(log_dir, exist_ok=True)
-
-
-class DevelopmentConfig(Config):
-    """Development configuration"""
-
-    DEBUG = True
-    TESTING = False
-    SESSION_COOKIE_SECURE = False
-
-    # Allow cross-origin requests in development
-    CORS_ORIGINS = "*"
-
-
-class TestingConfig(Config):
-    """Testing configuration"""
-
-    TESTING = True
-    DATABASE_PATH = ':memory:'  # Use in-memory database
-    SOCKETIO_ASYNC_MODE = 'threading'
+        if not os.path.isdir(self.LOG_DIR):
+            os.makedirs(self.LOG_DIR, exist_ok=True)
 
-    # Disable rate limiting in tests
-    RATELIMIT_ENABLED = False
-
-
-class ProductionConfig(Config):
-    """Production configuration"""
-
-    DEBUG = False
-    TESTING = False
 
+_PRODUCTION = {
     # Force HTTPS
-    SESSION_COOKIE_SECURE = True
-    PREFERRED_URL_SCHEME = 'https'
+    'SESSION_COOKIE_SECURE': True,
+    'PREFERRED_URL_SCHEME': 'https',
 
     # Stricter CORS
-    CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'https://temi-control.example.com').split(',')
+    'CORS_ORIGINS': _CORS_ORIGINS,
 
     # Use Redis for message queues (requires redis-server running)
-    SOCKETIO_MESSAGE_QUEUE = os.environ.get('REDIS_URL') or 'redis://localhost:6379/0'
+    'SOCKETIO_MESSAGE_QUEUE': _REDIS_URL or 'redis://localhost:6379/0',
 
     # Redis cache
-    CACHE_TYPE = 'RedisCache'
-    CACHE_REDIS_URL = os.environ.get('REDIS_URL') or 'redis://localhost:6379/1'
+    'CACHE_TYPE': sys.intern('RedisCache'),
+    'CACHE_REDIS_URL': _REDIS_URL or 'redis://localhost:6379/1',
 
     # Higher rate limits for production
-    RATELIMIT_DEFAULT = "500 per day, 100 per hour"
+    'RATELIMIT_DEFAULT': "500 per day, 100 per hour",
+}
 
+# Per-environment overrides applied on top of the Config defaults
+_PROFILES = {
+    'development': {
+        'DEBUG': True,
+        'SESSION_COOKIE_SECURE': False,
+        # Allow cross-origin requests in development
+        'CORS_ORIGINS': "*",
+    },
+    'testing': {
+        'TESTING': True,
+        'DATABASE_PATH': ':memory:',  # Use in-memory database
+        'SOCKETIO_ASYNC_MODE': sys.intern('threading'),
+        # Disable rate limiting in tests
+        'RATELIMIT_ENABLED': False,
+    },
+    'production': _PRODUCTION,
+    # Similar to production with some relaxed limits
+    'staging': {
+        **_PRODUCTION,
+        'RATELIMIT_DEFAULT': "1000 per day, 200 per hour",
+    },
+}
+_PROFILES['default'] = _PROFILES['development']
 
-class StagingConfig(ProductionConfig):
-    """Staging configuration (similar to production with some relaxed limits)"""
+# Profile names are interned so get_config's lookup can match by identity
+_PROFILES = {sys.intern(name): overrides for name, overrides in _PROFILES.items()}
 
-    DEBUG = False
-    TESTING = False
 
-    # Slightly more lenient than production
-    RATELIMIT_DEFAULT = "1000 per day, 200 per hour"
+# Settings baked at build time by `python config.py --freeze` (optional)
+_FROZEN_MODULE = '_config_frozen'
+_FROZEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), _FROZEN_MODULE + '.py')
 
+# Credentials are never baked into the generated module
+_SECRET_FIELDS = frozenset({'SECRET_KEY', 'MQTT_PASSWORD', 'SMTP_PASSWORD', 'TWILIO_AUTH_TOKEN'})
 
-# Configuration dictionary
-config = {
-    'development': DevelopmentConfig,
-    'testing': TestingConfig,
-    'production': ProductionConfig,
-    'staging': StagingConfig,
-    'default': DevelopmentConfig
-}
+
+def _load_frozen(env):
+    """Build the config from frozen literals if they were generated for this env"""
+    try:
+        frozen = import_module(_FROZEN_MODULE)
+    except ImportError:
+        return None
+    if frozen.FLASK_ENV != env:
+        return None
+    return Config(**frozen.SETTINGS)
 
 
+def freeze_config(path=_FROZEN_PATH):
+    """
+    Write the active configuration to a module of literal constants
+
+    Intended as a build step for fixed deploy targets, so production start-up
+    does not probe the environment for every setting. Credentials are never
+    written out; they are still resolved from the environment at run time.
+
+    Returns:
+        Path of the generated module
+    """
+    active = get_config()
+    env = _get('FLASK_ENV', 'development').lower()
+    settings = {
+        f.name: getattr(active, f.name)
+        for f in fields(active)
+        if f.init and f.name not in _SECRET_FIELDS
+    }
+    lines = [
+        '"""Generated by config.py --freeze; do not edit by hand"""',
+        '',
+        f'FLASK_ENV = {env!r}',
+        '',
+        'SETTINGS = {',
+    ]
+    lines += [f'    {name!r}: {value!r},' for name, value in settings.items()]
+    lines += ['}', '']
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines))
+    return path
+
+
+@cache
 def get_config() -> Config:
     """
     Get configuration based on FLASK_ENV environment variable
 
+    The result is memoized; FLASK_ENV and the environment-backed fields are
+    only resolved on the first call.
+
     Returns:
-        Config class instance
+        Config instance (frozen) with the matching profile applied
     """
-    env = os.environ.get('FLASK_ENV', 'development').lower()
-    config_class = config.get(env, DevelopmentConfig)
-    return config_class
+    env = sys.intern(_get('FLASK_ENV', 'development').lower())
+    frozen = _load_frozen(env)
+    if frozen is not None:
+        return frozen
+    overrides = _PROFILES.get(env, _PROFILES['development'])
+    return replace(Config(), **overrides)
+
+
+@cache
+def get_config_mapping() -> Mapping[str, Any]:
+    """
+    Get the active configuration as a read-only mapping
+
+    Suitable for app.config.from_mapping(); writes raise TypeError, so the
+    mapping can be shared between threads without copying.
+
+    Returns:
+        MappingProxyType of the public (upper-case) settings
+    """
+    active = get_config()
+    return MappingProxyType({f.name: getattr(active, f.name) for f in fields(active) if f.name.isupper()})
+
+
+if __name__ == '__main__':
+    if '--freeze' in sys.argv:
+        print(f"Frozen configuration written to {freeze_config()}")
+    else:
+        print("Usage: python config.py --freeze")
@@ -6,12 +6,73 @@ Handles SQLite database operations and models
 import sqlite3
 import json
 import hashlib
-from datetime import datetime
+import hmac
+import os
+import queue
+import atexit
+import logging
+import threading
+import time
+import itertools
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+from collections import defaultdict
 from contextlib import contextmanager
-from typing import Dict, List, Optional, Any
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Any
+
+logger = logging.getLogger(__name__)
 
 DATABASE_PATH = 'temi_control.db'
 
+# Stored in PRAGMA user_version once init_database has run. Bump it whenever
+# tables, columns, indexes or default settings change so existing databases
+# are migrated on the next start.
+SCHEMA_VERSION = 5
+
+
+def _dump_json(value: Any) -> str:
+    """Serialize a value for a *_json TEXT column using compact separators"""
+    return json.dumps(value, separators=(',', ':'))
+
+
+# INSERT ... RETURNING needs SQLite 3.35+; older builds fall back to lastrowid
+_SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+def _insert_returning_id(cursor, sql: str, params) -> int:
+    """Run a single-row INSERT and return the new row's id"""
+    if _SUPPORTS_RETURNING:
+        cursor.execute(sql + " RETURNING id", params)
+        return cursor.fetchone()[0]
+    cursor.execute(sql, params)
+    return cursor.lastrowid
+
+
+def _where_clause(filters: List[tuple]) -> tuple:
+    """
+    Build "WHERE a AND b ..." from (condition, value) pairs, skipping None values
+
+    Each combination of active filters always yields the same SQL text, so
+    repeated calls hit the connection's statement cache while every
+    condition stays a plain comparison the planner can use an index for.
+    """
+    active = [(condition, value) for condition, value in filters if value is not None]
+    if not active:
+        return '', []
+    return ('WHERE ' + ' AND '.join(condition for condition, _ in active),
+            [value for _, value in active])
+
+
+def _iter_rows(cursor, chunk: int = 256) -> Iterator[Dict]:
+    """Yield an executed cursor's rows as dicts, fetching `chunk` rows at a time"""
+    while True:
+        rows = cursor.fetchmany(chunk)
+        if not rows:
+            return
+        for row in rows:
+            yield dict(row)
+
 
 def _ensure_columns(conn, table: str, columns: List[Dict[str, str]]) -> None:
     """Ensure columns exist in a table (SQLite)"""
@@ -19,12 +80,17 @@ def _ensure_columns(conn, table: str, columns: List[Dict[str, str]]) -> None:
     cursor.execute(f"PRAGMA table_info({table})")
     existing = {row[1] for row in cursor.fetchall()}
 
-    for col in columns:
+    missing = [col for col in columns if col['name'] not in existing]
+    if not missing:
+        return
+
+    # Add all missing columns in one transaction
+    if not conn.in_transaction:
+        cursor.execute("BEGIN IMMEDIATE")
+    for col in missing:
         name = col['name']
         col_type = col['type']
         default = col.get('default')
-        if name in existing:
-            continue
         if default is not None:
             cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {col_type} DEFAULT {default}")
         else:
@@ -32,21 +98,222 @@ def _ensure_columns(conn, table: str, columns: List[Dict[str, str]]) -> None:
     conn.commit()
 
 
+# Per-connection tuning: synchronous=NORMAL only fsyncs at WAL checkpoints
+# instead of on every commit, and mmap lets reads skip the read() syscalls.
+# journal_mode=WAL is persistent, so init_database sets it once per file.
+_CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA busy_timeout=5000",
+)
+
+
+def _configure(conn) -> None:
+    """Apply performance PRAGMAs to a freshly opened connection"""
+    for pragma in _CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+
+
+class _ConnectionPool:
+    """
+    Process-wide pool of reusable SQLite connections
+
+    Connections are opened on demand, handed to one caller at a time and
+    returned afterwards, so the page cache and WAL index stay warm between
+    calls. At most `max_idle` idle connections are kept; extras are closed.
+    """
+
+    # sqlite3 caches 128 prepared statements per connection by default; the
+    # module issues more distinct queries than that
+    CACHED_STATEMENTS = 256
+    # Writable connections run PRAGMA optimize every this many check-ins so
+    # planner statistics follow the data as it grows
+    OPTIMIZE_EVERY = 1000
+
+    def __init__(self, read_only: bool = False, max_idle: int = 8):
+        self.read_only = read_only
+        # LIFO so the most recently used (warmest) connection is reused first
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+        self._path = None
+        # next() on a count is atomic, so concurrent releases never share a number
+        self._checkins = itertools.count(1)
+
+    def _connect(self, path: str):
+        if self.read_only:
+            conn = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro",
+                                   uri=True, check_same_thread=False,
+                                   cached_statements=self.CACHED_STATEMENTS)
+        else:
+            conn = sqlite3.connect(path, check_same_thread=False,
+                                   cached_statements=self.CACHED_STATEMENTS)
+        conn.row_factory = sqlite3.Row
+        _configure(conn)
+        return conn
+
+    def clear(self) -> None:
+        """Close all idle connections"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def acquire(self):
+        # DATABASE_PATH may be reassigned after import; drop stale connections
+        if self._path != DATABASE_PATH:
+            self.clear()
+            self._path = DATABASE_PATH
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect(DATABASE_PATH)
+
+    def release(self, conn) -> None:
+        # Match the old close() semantics: uncommitted work is discarded
+        if conn.in_transaction:
+            conn.rollback()
+        if not self.read_only:
+            if next(self._checkins) % self.OPTIMIZE_EVERY == 0:
+                conn.execute("PRAGMA optimize")
+        if self._path != DATABASE_PATH:
+            conn.close()
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
+_pool = _ConnectionPool()
+_readonly_pool = _ConnectionPool(read_only=True)
+
+
 @contextmanager
 def get_db():
     """Context manager for database connections"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = _pool.acquire()
+    try:
+        yield conn
+    finally:
+        _pool.release(conn)
+
+
+@contextmanager
+def get_db_readonly():
+    """Context manager for read-only database connections"""
+    conn = _readonly_pool.acquire()
     try:
         yield conn
     finally:
-        conn.close()
+        _readonly_pool.release(conn)
+
+
+@lru_cache(maxsize=None)
+def _build_default_settings() -> Dict[str, str]:
+    """Default settings rows, built once per process (treat as read-only)"""
+    # Note: MQTT broker credentials should be set via .env file or Settings page
+    default_mqtt_broker = os.getenv('CLOUD_MQTT_HOST', '')
+    default_mqtt_port = os.getenv('CLOUD_MQTT_PORT', '8883')
+    default_mqtt_username = os.getenv('CLOUD_MQTT_USERNAME', '')
+    default_mqtt_password = os.getenv('CLOUD_MQTT_PASSWORD', '')
+
+    return {
+        'default_mqtt_broker': default_mqtt_broker,
+        'default_mqtt_port': default_mqtt_port,
+        'default_mqtt_use_tls': 'true',
+        'default_mqtt_username': default_mqtt_username,
+        'default_mqtt_password': default_mqtt_password,
+        'low_battery_threshold': '10',
+        'low_battery_action': 'complete_current',  # or 'stop_immediately'
+        'low_battery_webview_url': 'file:///storage/emulated/0/temiscreens/LowBattery.htm',
+        'low_battery_return_webview_url': 'file:///storage/emulated/0/temiscreens/LowBatteryReturn.htm',
+        'default_movement_speed': '0.5',
+        'home_base_location': 'home base',
+        'waypoint_timeout': '60',
+        'waypoint_max_retries': '2',
+        'detection_timeout_seconds': '30',
+        'no_violation_seconds': '5',
+        'violation_action_default': 'tts',
+        'violation_tts_default': 'Please follow safety protocols and wear proper PPE.',
+        'violation_display_type_default': 'webview',
+        'violation_display_content_default': '',
+        'yolo_stream_url': 'http://192.168.18.135:8080',
+        'yolo_script_path': '',
+        'patrolling_webview_url': 'file:///storage/emulated/0/temiscreens/Patrolling.htm',
+        'going_to_waypoint_webview_url': 'file:///storage/emulated/0/temiscreens/GoingToWaypoint.htm',
+        'arrived_waypoint_webview_url': 'file:///storage/emulated/0/temiscreens/ArrivedWaypoint.htm',
+        'inspection_start_webview_url': 'file:///storage/emulated/0/temiscreens/InspectionStart.htm',
+        'no_violation_webview_url': 'file:///storage/emulated/0/temiscreens/NoViolation.htm',
+        'violation_webview_url': 'file:///storage/emulated/0/temiscreens/Violation.htm',
+        'violation_timeout_webview_url': 'file:///storage/emulated/0/temiscreens/ViolationTimeout.htm',
+        'going_home_webview_url': 'file:///storage/emulated/0/temiscreens/GoingHome.htm',
+        'arrived_home_webview_url': 'file:///storage/emulated/0/temiscreens/ArrivedHome.htm',
+        'no_violation_tts': 'No violation detected. Moving to next waypoint.',
+        'yolo_shutdown_timeout': '30',
+        'high_violation_threshold': '5',
+        'violation_debounce_window': '10',
+        'violation_smoothing_factor': '0.3',
+        'outlier_threshold': '3.0',
+        'map_scale_pixels_per_meter': '50',
+        'map_origin_x': '0',
+        'map_origin_y': '0',
+        'tts_wait_seconds': '3',
+        'display_wait_seconds': '2',
+        'webview_close_delay_seconds': '5',
+        'activity_log_retention_days': '90',  # 0 keeps logs forever
+        'arrival_action_delay_seconds': '2',
+        'patrol_stop_home_timeout_seconds': '15',
+        'patrol_stop_always_send_home': 'false',
+        'notifications_enabled': 'false',
+        'notify_in_app': 'true',
+        'notify_email': 'false',
+        'notify_sms': 'false',
+        'notify_webpush': 'false',
+        'notify_telegram': 'false',
+        'notify_whatsapp': 'false',
+        'notify_only_high': 'true',
+        'notify_digest_frequency': 'daily',
+        'smtp_host': '',
+        'smtp_port': '587',
+        'smtp_user': '',
+        'smtp_password': '',
+        'smtp_from': '',
+        'smtp_to': '',
+        'smtp_use_tls': 'true',
+        'twilio_account_sid': '',
+        'twilio_auth_token': '',
+        'twilio_from': '',
+        'twilio_to': '',
+        'telegram_bot_token': '',
+        'telegram_chat_id': '',
+        'twilio_whatsapp_from': '',
+        'twilio_whatsapp_to': '',
+        # YOLO Inspection Patrol settings
+        'inspection_patrol_pipeline_timeout': '30',
+        'inspection_checking_duration_default': '30',
+        'inspection_webview_url': 'file:///storage/emulated/0/temiscreens/InspectionStatus.htm',
+        'inspection_tts_start_default': 'Starting inspection at {waypoint}',
+        'inspection_tts_no_violation_default': 'No violations detected at {waypoint}',
+        'inspection_tts_violation_default': 'Safety violations detected: {count}'
+    }
 
 
 def init_database():
     """Initialize database with all required tables"""
     with get_db() as conn:
         cursor = conn.cursor()
+
+        # WAL lets readers run alongside the writer; stored in the file header.
+        # auto_vacuum only takes effect on a new, empty database file.
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        cursor.execute("PRAGMA journal_mode=WAL")
+
+        # Databases already migrated to this schema need no DDL at all
+        cursor.execute("PRAGMA user_version")
+        if cursor.fetchone()[0] == SCHEMA_VERSION:
+            return
         
         # Users table
         cursor.execute('''
@@ -310,104 +577,18 @@ def init_database():
         conn.commit()
         
         # Create default admin user if not exists
-        cursor.execute("SELECT COUNT(*) FROM users WHERE username = ?", ('admin',))
-        if cursor.fetchone()[0] == 0:
-            password_hash = hash_password('admin123')
-            cursor.execute("INSERT INTO users (username, password_hash) VALUES (?, ?)",
-                         ('admin', password_hash))
-            conn.commit()
+        cursor.execute('''
+            INSERT INTO users (username, password_hash) VALUES (?, ?)
+            ON CONFLICT(username) DO NOTHING
+        ''', ('admin', hash_password('admin123')))
+        conn.commit()
         
         # Create default settings if not exist
-        # Note: MQTT broker credentials should be set via .env file or Settings page
-        import os
-        default_mqtt_broker = os.getenv('CLOUD_MQTT_HOST', '')
-        default_mqtt_port = os.getenv('CLOUD_MQTT_PORT', '8883')
-        default_mqtt_username = os.getenv('CLOUD_MQTT_USERNAME', '')
-        default_mqtt_password = os.getenv('CLOUD_MQTT_PASSWORD', '')
-
-        default_settings = {
-            'default_mqtt_broker': default_mqtt_broker,
-            'default_mqtt_port': default_mqtt_port,
-            'default_mqtt_use_tls': 'true',
-            'default_mqtt_username': default_mqtt_username,
-            'default_mqtt_password': default_mqtt_password,
-            'low_battery_threshold': '10',
-            'low_battery_action': 'complete_current',  # or 'stop_immediately'
-            'low_battery_webview_url': 'file:///storage/emulated/0/temiscreens/LowBattery.htm',
-            'low_battery_return_webview_url': 'file:///storage/emulated/0/temiscreens/LowBatteryReturn.htm',
-            'default_movement_speed': '0.5',
-            'home_base_location': 'home base',
-            'waypoint_timeout': '60',
-            'waypoint_max_retries': '2',
-            'detection_timeout_seconds': '30',
-            'no_violation_seconds': '5',
-            'violation_action_default': 'tts',
-            'violation_tts_default': 'Please follow safety protocols and wear proper PPE.',
-            'violation_display_type_default': 'webview',
-            'violation_display_content_default': '',
-            'yolo_stream_url': 'http://192.168.18.135:8080',
-            'yolo_script_path': '',
-            'patrolling_webview_url': 'file:///storage/emulated/0/temiscreens/Patrolling.htm',
-            'going_to_waypoint_webview_url': 'file:///storage/emulated/0/temiscreens/GoingToWaypoint.htm',
-            'arrived_waypoint_webview_url': 'file:///storage/emulated/0/temiscreens/ArrivedWaypoint.htm',
-            'inspection_start_webview_url': 'file:///storage/emulated/0/temiscreens/InspectionStart.htm',
-            'no_violation_webview_url': 'file:///storage/emulated/0/temiscreens/NoViolation.htm',
-            'violation_webview_url': 'file:///storage/emulated/0/temiscreens/Violation.htm',
-            'violation_timeout_webview_url': 'file:///storage/emulated/0/temiscreens/ViolationTimeout.htm',
-            'going_home_webview_url': 'file:///storage/emulated/0/temiscreens/GoingHome.htm',
-            'arrived_home_webview_url': 'file:///storage/emulated/0/temiscreens/ArrivedHome.htm',
-            'no_violation_tts': 'No violation detected. Moving to next waypoint.',
-            'yolo_shutdown_timeout': '30',
-            'high_violation_threshold': '5',
-            'violation_debounce_window': '10',
-            'violation_smoothing_factor': '0.3',
-            'outlier_threshold': '3.0',
-            'map_scale_pixels_per_meter': '50',
-            'map_origin_x': '0',
-            'map_origin_y': '0',
-            'tts_wait_seconds': '3',
-            'display_wait_seconds': '2',
-            'webview_close_delay_seconds': '5',
-            'arrival_action_delay_seconds': '2',
-            'patrol_stop_home_timeout_seconds': '15',
-            'patrol_stop_always_send_home': 'false',
-            'notifications_enabled': 'false',
-            'notify_in_app': 'true',
-            'notify_email': 'false',
-            'notify_sms': 'false',
-            'notify_webpush': 'false',
-            'notify_telegram': 'false',
-            'notify_whatsapp': 'false',
-            'notify_only_high': 'true',
-            'notify_digest_frequency': 'daily',
-            'smtp_host': '',
-            'smtp_port': '587',
-            'smtp_user': '',
-            'smtp_password': '',
-            'smtp_from': '',
-            'smtp_to': '',
-            'smtp_use_tls': 'true',
-            'twilio_account_sid': '',
-            'twilio_auth_token': '',
-            'twilio_from': '',
-            'twilio_to': '',
-            'telegram_bot_token': '',
-            'telegram_chat_id': '',
-            'twilio_whatsapp_from': '',
-            'twilio_whatsapp_to': '',
-            # YOLO Inspection Patrol settings
-            'inspection_patrol_pipeline_timeout': '30',
-            'inspection_checking_duration_default': '30',
-            'inspection_webview_url': 'file:///storage/emulated/0/temiscreens/InspectionStatus.htm',
-            'inspection_tts_start_default': 'Starting inspection at {waypoint}',
-            'inspection_tts_no_violation_default': 'No violations detected at {waypoint}',
-            'inspection_tts_violation_default': 'Safety violations detected: {count}'
-        }
-
-        for key, value in default_settings.items():
-            cursor.execute("INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)",
-                         (key, value))
+        cursor.executemany("INSERT INTO settings (key, value) VALUES (?, ?) "
+                           "ON CONFLICT(key) DO NOTHING",
+                           list(_build_default_settings().items()))
         conn.commit()
+        clear_settings_cache()
 
         # Ensure new waypoint columns exist
         _ensure_columns(conn, 'route_waypoints', [
@@ -451,29 +632,107 @@ def init_database():
             {'name': 'last_run_at', 'type': 'TIMESTAMP'}
         ])
 
+        # Indexes for the per-robot / per-route lookups (after migrations,
+        # since older databases only gain some of these columns above)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_route_waypoints_route "
+                       "ON route_waypoints(route_id, sequence_order)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_routes_robot ON routes(robot_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_violations_robot_ts "
+                       "ON violations(robot_id, timestamp DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_activity_logs_robot_created "
+                       "ON activity_logs(robot_id, created_at DESC)")
+        # Unfiltered "latest N" listings and the dashboard counters
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_violations_ts ON violations(timestamp DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_violations_ack_sev "
+                       "ON violations(acknowledged, severity)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_violations_pending "
+                       f"ON violations(robot_id, severity) WHERE {_PENDING_VIOLATION_SQL}")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_activity_logs_created "
+                       "ON activity_logs(created_at DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_waypoint_summaries_robot_ts "
+                       "ON waypoint_summaries(robot_id, timestamp DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_detection_sessions_robot_status "
+                       "ON detection_sessions(robot_id, status, started_at DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_patrol_history_robot_status "
+                       "ON patrol_history(robot_id, status, started_at DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_inspection_waypoints_route_seq "
+                       "ON yolo_inspection_waypoints(inspection_route_id, sequence_order)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_waypoint_inspections_session_ts "
+                       "ON yolo_waypoint_inspections(inspection_session_id, timestamp_start)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_inspection_sessions_robot_started "
+                       "ON yolo_inspection_sessions(robot_id, started_at DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_inspection_routes_robot_created "
+                       "ON yolo_inspection_routes(robot_id, created_at DESC)")
+        conn.commit()
+
+        # Gather planner statistics for the new indexes (runs once per schema version)
+        cursor.execute("ANALYZE")
+
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+PASSWORD_HASH_ALGORITHM = 'pbkdf2_sha256'
+PASSWORD_HASH_ITERATIONS = 200_000
 
-def hash_password(password: str) -> str:
-    """Hash password using SHA-256"""
-    return hashlib.sha256(password.encode()).hexdigest()
+
+def hash_password(password: str, salt: Optional[bytes] = None,
+                  iterations: int = PASSWORD_HASH_ITERATIONS) -> str:
+    """Hash password with salted PBKDF2-SHA256 ("algorithm$iterations$salt$hash")"""
+    if salt is None:
+        salt = os.urandom(16)
+    derived = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+    return f"{PASSWORD_HASH_ALGORITHM}${iterations}${salt.hex()}${derived.hex()}"
+
+
+def _is_legacy_hash(password_hash: str) -> bool:
+    """Hashes from before PBKDF2 were bare unsalted SHA-256 hex digests"""
+    return '$' not in password_hash
 
 
 def verify_password(password: str, password_hash: str) -> bool:
-    """Verify password against hash"""
-    return hash_password(password) == password_hash
+    """Verify password against hash (constant-time comparison)"""
+    if _is_legacy_hash(password_hash):
+        candidate = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(candidate, password_hash)
+
+    try:
+        algorithm, iterations, salt_hex, _ = password_hash.split('$')
+        if algorithm != PASSWORD_HASH_ALGORITHM:
+            return False
+        candidate = hash_password(password, bytes.fromhex(salt_hex), int(iterations))
+    except ValueError:
+        return False
+    return hmac.compare_digest(candidate, password_hash)
 
 
 # User operations
-def authenticate_user(username: str, password: str) -> Optional[Dict]:
-    """Authenticate user and return user data"""
+@lru_cache(maxsize=256)
+def _lookup_user(username: str) -> Optional[Dict]:
+    """Fetch a user row (cached; cleared whenever users or hashes change)"""
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
-        user = cursor.fetchone()
-        
-        if user and verify_password(password, user['password_hash']):
-            return dict(user)
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+
+def authenticate_user(username: str, password: str) -> Optional[Dict]:
+    """Authenticate user and return user data"""
+    cached = _lookup_user(username)
+    if not cached or not verify_password(password, cached['password_hash']):
         return None
 
+    user = dict(cached)
+    if _is_legacy_hash(user['password_hash']):
+        # Upgrade SHA-256 hashes to PBKDF2 on the first successful login
+        user['password_hash'] = hash_password(password)
+        with get_db() as conn:
+            conn.execute("UPDATE users SET password_hash = ? WHERE id = ?",
+                         (user['password_hash'], user['id']))
+            conn.commit()
+        _lookup_user.cache_clear()
+    return user
+
 
 def create_user(username: str, password: str) -> bool:
     """Create a new user"""
@@ -484,25 +743,36 @@ def create_user(username: str, password: str) -> bool:
             cursor.execute("INSERT INTO users (username, password_hash) VALUES (?, ?)",
                          (username, password_hash))
             conn.commit()
-            return True
+        _lookup_user.cache_clear()
+        return True
     except sqlite3.IntegrityError:
         return False
 
 
 # Robot operations
-def get_all_robots() -> List[Dict]:
-    """Get all robots"""
+_SELECT_ALL_ROBOTS_SQL = "SELECT * FROM robots ORDER BY created_at DESC"
+_SELECT_ROBOT_BY_ID_SQL = "SELECT * FROM robots WHERE id = ?"
+_SELECT_ROBOT_BY_SERIAL_SQL = "SELECT * FROM robots WHERE serial_number = ?"
+
+
+def get_all_robots_iter() -> Iterator[Dict]:
+    """Iterate over all robots, converting one row at a time"""
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM robots ORDER BY created_at DESC")
-        return [dict(row) for row in cursor.fetchall()]
+        cursor.execute(_SELECT_ALL_ROBOTS_SQL)
+        yield from _iter_rows(cursor)
+
+
+def get_all_robots() -> List[Dict]:
+    """Get all robots"""
+    return list(get_all_robots_iter())
 
 
 def get_robot_by_id(robot_id: int) -> Optional[Dict]:
     """Get robot by ID"""
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM robots WHERE id = ?", (robot_id,))
+        cursor.execute(_SELECT_ROBOT_BY_ID_SQL, (robot_id,))
         row = cursor.fetchone()
         return dict(row) if row else None
 
@@ -511,7 +781,7 @@ def get_robot_by_serial(serial_number: str) -> Optional[Dict]:
     """Get robot by serial number"""
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM robots WHERE serial_number = ?", (serial_number,))
+        cursor.execute(_SELECT_ROBOT_BY_SERIAL_SQL, (serial_number,))
         row = cursor.fetchone()
         return dict(row) if row else None
 
@@ -539,19 +809,42 @@ def create_robot(name: str, serial_number: str, mqtt_config: Optional[Dict] = No
         return cursor.lastrowid
 
 
+# Columns update_robot may write; anything else is ignored
+_ROBOT_UPDATABLE = frozenset({
+    'name', 'serial_number', 'mqtt_broker_url', 'mqtt_port', 'mqtt_username',
+    'mqtt_password', 'use_tls', 'connection_status', 'battery_level', 'is_charging',
+    'current_location', 'waypoints_json', 'last_seen', 'map_image_url',
+    'waypoints_positions_json',
+})
+
+# UPDATE statements keyed by table and (sorted) column tuple, so each shape
+# of update produces identical SQL text and hits SQLite's statement cache
+_update_sql: Dict[tuple, str] = {}
+
+
+def _get_update_sql(table: str, columns: tuple, touch: Optional[str] = None) -> str:
+    """`touch` names a timestamp column SQLite sets to CURRENT_TIMESTAMP itself"""
+    sql = _update_sql.get((table, columns, touch))
+    if sql is None:
+        assignments = [f"{column} = ?" for column in columns]
+        if touch:
+            assignments.append(f"{touch} = CURRENT_TIMESTAMP")
+        sql = _update_sql[table, columns, touch] = (
+            f"UPDATE {table} SET {', '.join(assignments)} WHERE id = ?")
+    return sql
+
+
 def update_robot(robot_id: int, **kwargs) -> bool:
     """Update robot fields"""
-    if not kwargs:
+    columns = tuple(sorted(key for key in kwargs if key in _ROBOT_UPDATABLE))
+    if not columns:
         return False
     
     with get_db() as conn:
         cursor = conn.cursor()
-        
-        # Build SET clause dynamically
-        set_clause = ', '.join([f"{key} = ?" for key in kwargs.keys()])
-        values = list(kwargs.values()) + [robot_id]
-        
-        cursor.execute(f"UPDATE robots SET {set_clause} WHERE id = ?", values)
+        values = [kwargs[column] for column in columns]
+        values.append(robot_id)
+        cursor.execute(_get_update_sql('robots', columns), values)
         conn.commit()
         return cursor.rowcount > 0
 
@@ -565,27 +858,87 @@ def delete_robot(robot_id: int) -> bool:
         return cursor.rowcount > 0
 
 
+# Status UPDATEs keyed by the optional columns present; last_seen is set
+# by SQLite itself, like the created_at defaults
+_robot_status_sql: Dict[tuple, str] = {}
+
+
 def update_robot_status(robot_id: int, status: str, battery_level: Optional[int] = None,
                        is_charging: Optional[bool] = None, current_location: Optional[str] = None) -> bool:
     """Update robot status"""
-    updates = {'connection_status': status, 'last_seen': datetime.now()}
-    
-    if battery_level is not None:
-        updates['battery_level'] = battery_level
-    if is_charging is not None:
-        updates['is_charging'] = is_charging
-    if current_location is not None:
-        updates['current_location'] = current_location
-    
-    return update_robot(robot_id, **updates)
+    optional = (('battery_level', battery_level), ('is_charging', is_charging),
+                ('current_location', current_location))
+    columns = tuple(column for column, value in optional if value is not None)
+
+    sql = _robot_status_sql.get(columns)
+    if sql is None:
+        set_clause = ''.join(f", {column} = ?" for column in columns)
+        sql = _robot_status_sql[columns] = (
+            "UPDATE robots SET connection_status = ?, last_seen = CURRENT_TIMESTAMP"
+            f"{set_clause} WHERE id = ?")
+
+    values = [status]
+    values.extend(value for _, value in optional if value is not None)
+    values.append(robot_id)
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, values)
+        conn.commit()
+        return cursor.rowcount > 0
 
 
 def update_robot_waypoints(robot_id: int, waypoints: List[str]) -> bool:
     """Update robot's waypoint list"""
-    return update_robot(robot_id, waypoints_json=json.dumps(waypoints))
+    return update_robot(robot_id, waypoints_json=_dump_json(waypoints))
 
 
 # Route operations
+_INSERT_ROUTE_WAYPOINT_SQL = '''
+    INSERT INTO route_waypoints
+    (route_id, waypoint_name, sequence_order, display_type,
+     display_content, tts_message, dwell_time, detection_enabled,
+     detection_timeout, no_violation_seconds, violation_action,
+     violation_tts_message, violation_display_type, violation_display_content,
+     webview_close_delay)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def _fetch_children(cursor, table: str, parent_column: str,
+                    parent_ids: List[int]) -> Dict[int, List[Dict]]:
+    """Fetch ordered waypoint rows for several parents at once, grouped by parent id"""
+    grouped = defaultdict(list)
+    if not parent_ids:
+        return grouped
+    placeholders = ', '.join('?' * len(parent_ids))
+    cursor.execute(f"""
+        SELECT * FROM {table}
+        WHERE {parent_column} IN ({placeholders})
+        ORDER BY {parent_column}, sequence_order
+    """, parent_ids)
+    for row in cursor.fetchall():
+        grouped[row[parent_column]].append(dict(row))
+    return grouped
+
+
+def _route_waypoint_rows(route_id: int, waypoints: List[Dict]) -> List[tuple]:
+    """Build route_waypoints parameter rows, numbering waypoints in list order"""
+    return [
+        (route_id, waypoint['waypoint_name'], i,
+         waypoint.get('display_type'), waypoint.get('display_content'),
+         waypoint.get('tts_message'), waypoint.get('dwell_time', 5),
+         waypoint.get('detection_enabled', 0),
+         waypoint.get('detection_timeout'),
+         waypoint.get('no_violation_seconds'),
+         waypoint.get('violation_action'),
+         waypoint.get('violation_tts_message'),
+         waypoint.get('violation_display_type'),
+         waypoint.get('violation_display_content'),
+         waypoint.get('webview_close_delay'))
+        for i, waypoint in enumerate(waypoints)
+    ]
+
+
 def get_all_routes(robot_id: Optional[int] = None) -> List[Dict]:
     """Get all routes, optionally filtered by robot"""
     with get_db() as conn:
@@ -609,14 +962,11 @@ def get_all_routes(robot_id: Optional[int] = None) -> List[Dict]:
         
         routes = [dict(row) for row in cursor.fetchall()]
         
-        # Get waypoints for each route
+        # Get waypoints for all routes in one query
+        waypoints = _fetch_children(cursor, 'route_waypoints', 'route_id',
+                                    [route['id'] for route in routes])
         for route in routes:
-            cursor.execute("""
-                SELECT * FROM route_waypoints 
-                WHERE route_id = ? 
-                ORDER BY sequence_order
-            """, (route['id'],))
-            route['waypoints'] = [dict(row) for row in cursor.fetchall()]
+            route['waypoints'] = waypoints.get(route['id'], [])
         
         return routes
 
@@ -656,32 +1006,16 @@ def create_route(name: str, robot_id: int, waypoints: List[Dict], loop_count: in
     with get_db() as conn:
         cursor = conn.cursor()
         
+        cursor.execute("BEGIN IMMEDIATE")
+
         # Create route
-        cursor.execute("INSERT INTO routes (name, robot_id, loop_count, return_location) VALUES (?, ?, ?, ?)",
-                     (name, robot_id, loop_count, return_location))
-        route_id = cursor.lastrowid
+        route_id = _insert_returning_id(
+            cursor,
+            "INSERT INTO routes (name, robot_id, loop_count, return_location) VALUES (?, ?, ?, ?)",
+            (name, robot_id, loop_count, return_location))
         
         # Add waypoints
-        for i, waypoint in enumerate(waypoints):
-            cursor.execute('''
-                INSERT INTO route_waypoints 
-                (route_id, waypoint_name, sequence_order, display_type, 
-                 display_content, tts_message, dwell_time, detection_enabled,
-                 detection_timeout, no_violation_seconds, violation_action,
-                 violation_tts_message, violation_display_type, violation_display_content,
-                 webview_close_delay)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (route_id, waypoint['waypoint_name'], i,
-                  waypoint.get('display_type'), waypoint.get('display_content'),
-                  waypoint.get('tts_message'), waypoint.get('dwell_time', 5),
-                  waypoint.get('detection_enabled', 0),
-                  waypoint.get('detection_timeout'),
-                  waypoint.get('no_violation_seconds'),
-                  waypoint.get('violation_action'),
-                  waypoint.get('violation_tts_message'),
-                  waypoint.get('violation_display_type'),
-                  waypoint.get('violation_display_content'),
-                  waypoint.get('webview_close_delay')))
+        cursor.executemany(_INSERT_ROUTE_WAYPOINT_SQL, _route_waypoint_rows(route_id, waypoints))
         
         conn.commit()
         return route_id
@@ -693,6 +1027,7 @@ def update_route(route_id: int, name: Optional[str] = None,
     """Update route and/or waypoints"""
     with get_db() as conn:
         cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
         
         if name:
             cursor.execute("UPDATE routes SET name = ? WHERE id = ?", (name, route_id))
@@ -708,26 +1043,7 @@ def update_route(route_id: int, name: Optional[str] = None,
             cursor.execute("DELETE FROM route_waypoints WHERE route_id = ?", (route_id,))
             
             # Add new waypoints
-            for i, waypoint in enumerate(waypoints):
-                cursor.execute('''
-                    INSERT INTO route_waypoints 
-                    (route_id, waypoint_name, sequence_order, display_type, 
-                     display_content, tts_message, dwell_time, detection_enabled,
-                     detection_timeout, no_violation_seconds, violation_action,
-                     violation_tts_message, violation_display_type, violation_display_content,
-                     webview_close_delay)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (route_id, waypoint['waypoint_name'], i,
-                      waypoint.get('display_type'), waypoint.get('display_content'),
-                      waypoint.get('tts_message'), waypoint.get('dwell_time', 5),
-                      waypoint.get('detection_enabled', 0),
-                      waypoint.get('detection_timeout'),
-                      waypoint.get('no_violation_seconds'),
-                      waypoint.get('violation_action'),
-                      waypoint.get('violation_tts_message'),
-                      waypoint.get('violation_display_type'),
-                      waypoint.get('violation_display_content'),
-                      waypoint.get('webview_close_delay')))
+            cursor.executemany(_INSERT_ROUTE_WAYPOINT_SQL, _route_waypoint_rows(route_id, waypoints))
         
         conn.commit()
         return True
@@ -743,42 +1059,92 @@ def delete_route(route_id: int) -> bool:
 
 
 # Settings operations
+# Settings are read on most requests but rarely written, so both tables are
+# cached in-process and dropped whenever this module writes to them. Entries
+# also expire after SETTINGS_CACHE_TTL seconds so writes made by other
+# processes (e.g. other gunicorn workers) are picked up.
+SETTINGS_CACHE_TTL = 5.0
+_settings_lock = threading.RLock()
+_settings_cache: Optional[tuple] = None
+_robot_settings_cache: Dict[int, tuple] = {}
+_settings_cache_path: Optional[str] = None
+
+
+def clear_settings_cache() -> None:
+    """Drop cached settings (call after writing settings outside this module)"""
+    global _settings_cache
+    with _settings_lock:
+        _settings_cache = None
+        _robot_settings_cache.clear()
+
+
+def _check_settings_cache_path() -> None:
+    global _settings_cache_path
+    if _settings_cache_path != DATABASE_PATH:
+        clear_settings_cache()
+        _settings_cache_path = DATABASE_PATH
+
+
+def _cached_settings() -> Dict[str, str]:
+    global _settings_cache
+    with _settings_lock:
+        _check_settings_cache_path()
+        now = time.monotonic()
+        if _settings_cache is None or now - _settings_cache[0] >= SETTINGS_CACHE_TTL:
+            with get_db_readonly() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT key, value FROM settings")
+                _settings_cache = (now, {row['key']: row['value'] for row in cursor.fetchall()})
+        return _settings_cache[1]
+
+
+def _cached_robot_settings(robot_id: int) -> Dict[str, str]:
+    with _settings_lock:
+        _check_settings_cache_path()
+        now = time.monotonic()
+        entry = _robot_settings_cache.get(robot_id)
+        if entry is None or now - entry[0] >= SETTINGS_CACHE_TTL:
+            with get_db_readonly() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT key, value FROM robot_settings WHERE robot_id = ?",
+                               (robot_id,))
+                entry = (now, {row['key']: row['value'] for row in cursor.fetchall()})
+            _robot_settings_cache[robot_id] = entry
+        return entry[1]
+
+
 def get_setting(key: str, default: Any = None) -> Any:
     """Get setting value"""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
-        row = cursor.fetchone()
-        return row['value'] if row else default
+    return _cached_settings().get(key, default)
 
 
 def get_all_settings() -> Dict[str, str]:
     """Get all settings"""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT key, value FROM settings")
-        return {row['key']: row['value'] for row in cursor.fetchall()}
+    return dict(_cached_settings())
 
 
-def update_setting(key: str, value: str) -> bool:
-    """Update or create setting"""
+def upsert_setting(key: str, value: str) -> bool:
+    """Create a setting or update its value in place"""
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute('''
-            INSERT OR REPLACE INTO settings (key, value, updated_at) 
-            VALUES (?, ?, ?)
-        ''', (key, value, datetime.now()))
+            INSERT INTO settings (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value,
+                                           updated_at = CURRENT_TIMESTAMP
+        ''', (key, value))
         conn.commit()
-        return True
+    clear_settings_cache()
+    return True
+
+
+def update_setting(key: str, value: str) -> bool:
+    """Update or create setting"""
+    return upsert_setting(key, value)
 
 
 def get_robot_setting(robot_id: int, key: str, default: Any = None) -> Any:
     """Get per-robot setting value"""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT value FROM robot_settings WHERE robot_id = ? AND key = ?", (robot_id, key))
-        row = cursor.fetchone()
-        return row['value'] if row else default
+    return _cached_robot_settings(robot_id).get(key, default)
 
 
 def set_robot_setting(robot_id: int, key: str, value: str) -> bool:
@@ -786,55 +1152,141 @@ def set_robot_setting(robot_id: int, key: str, value: str) -> bool:
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute('''
-            INSERT OR REPLACE INTO robot_settings (robot_id, key, value, updated_at)
-            VALUES (?, ?, ?, ?)
-        ''', (robot_id, key, value, datetime.now()))
+            INSERT INTO robot_settings (robot_id, key, value) VALUES (?, ?, ?)
+            ON CONFLICT(robot_id, key) DO UPDATE SET value = excluded.value,
+                                                     updated_at = CURRENT_TIMESTAMP
+        ''', (robot_id, key, value))
         conn.commit()
-        return True
+    with _settings_lock:
+        _robot_settings_cache.pop(robot_id, None)
+    return True
 
 
 # Activity log operations
+_INSERT_ACTIVITY_LOG_SQL = '''
+    INSERT INTO activity_logs (robot_id, level, message, details, category)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+
+# Activity logs are written behind the caller's back: add_activity_log only
+# enqueues, and one daemon thread inserts whatever has accumulated in a
+# single transaction
+ACTIVITY_LOG_BATCH_SIZE = 500
+
+_activity_log_queue: queue.Queue = queue.Queue()
+_activity_log_writer: Optional[threading.Thread] = None
+_activity_log_writer_lock = threading.Lock()
+
+
+def _write_activity_logs() -> None:
+    while True:
+        entries = [_activity_log_queue.get()]
+        try:
+            while len(entries) < ACTIVITY_LOG_BATCH_SIZE:
+                entries.append(_activity_log_queue.get_nowait())
+        except queue.Empty:
+            pass
+        try:
+            try:
+                add_activity_logs_bulk(entries)
+            except sqlite3.Error as e:
+                # One unbindable row fails the whole batch; retry row by row so
+                # only the bad entries are dropped
+                logger.warning(f"Batch write of {len(entries)} activity log entries failed ({e}), retrying individually")
+                for entry in entries:
+                    try:
+                        add_activity_logs_bulk([entry])
+                    except Exception as entry_error:
+                        logger.error(f"Dropping activity log entry {entry!r}: {entry_error}")
+        except Exception as e:
+            # Never let the writer thread die, or flush_activity_logs() would hang
+            logger.error(f"Failed to write {len(entries)} activity log entries: {e}")
+        finally:
+            for _ in entries:
+                _activity_log_queue.task_done()
+
+
+def flush_activity_logs() -> None:
+    """Block until every queued activity log entry has been written"""
+    _activity_log_queue.join()
+
+
 def add_activity_log(robot_id: Optional[int], level: str, message: str,
-                    details: Optional[str] = None, category: Optional[str] = None) -> int:
-    """Add activity log entry"""
+                    details: Optional[str] = None, category: Optional[str] = None) -> None:
+    """Queue an activity log entry for the background writer"""
+    global _activity_log_writer
+    if _activity_log_writer is None:
+        with _activity_log_writer_lock:
+            if _activity_log_writer is None:
+                _activity_log_writer = threading.Thread(
+                    target=_write_activity_logs, name='activity-log-writer', daemon=True)
+                _activity_log_writer.start()
+                atexit.register(flush_activity_logs)
+    _activity_log_queue.put((robot_id, level, message, details, category))
+
+
+def add_activity_logs_bulk(entries: List[tuple]) -> int:
+    """Add several (robot_id, level, message, details, category) log entries in one transaction"""
+    if not entries:
+        return 0
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO activity_logs (robot_id, level, message, details, category)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (robot_id, level, message, details, category))
+        cursor.executemany(_INSERT_ACTIVITY_LOG_SQL, entries)
         conn.commit()
-        return cursor.lastrowid
+        return cursor.rowcount
+
+
+def _select_activity_logs(cursor, robot_id: Optional[int], limit: int) -> None:
+    if robot_id:
+        cursor.execute("""
+            SELECT al.*, r.name as robot_name
+            FROM activity_logs al
+            LEFT JOIN robots r ON al.robot_id = r.id
+            WHERE al.robot_id = ?
+            ORDER BY al.created_at DESC
+            LIMIT ?
+        """, (robot_id, limit))
+    else:
+        cursor.execute("""
+            SELECT al.*, r.name as robot_name
+            FROM activity_logs al
+            LEFT JOIN robots r ON al.robot_id = r.id
+            ORDER BY al.created_at DESC
+            LIMIT ?
+        """, (limit,))
+
+
+def get_activity_logs_iter(robot_id: Optional[int] = None, limit: int = 100) -> Iterator[Dict]:
+    """Iterate over activity logs, optionally filtered by robot"""
+    with get_db_readonly() as conn:
+        cursor = conn.cursor()
+        _select_activity_logs(cursor, robot_id, limit)
+        yield from _iter_rows(cursor)
 
 
 def get_activity_logs(robot_id: Optional[int] = None, limit: int = 100) -> List[Dict]:
     """Get activity logs, optionally filtered by robot"""
-    with get_db() as conn:
+    return list(get_activity_logs_iter(robot_id, limit))
+
+
+def get_activity_log_rows(robot_id: Optional[int] = None, limit: int = 100) -> List[sqlite3.Row]:
+    """
+    Get activity logs as read-only sqlite3.Row objects
+
+    Rows support key access (and attribute-style access in Jinja templates)
+    without a dict copy per row; use get_activity_logs for JSON or mutation.
+    """
+    with get_db_readonly() as conn:
         cursor = conn.cursor()
-        
-        if robot_id:
-            cursor.execute("""
-                SELECT al.*, r.name as robot_name
-                FROM activity_logs al
-                LEFT JOIN robots r ON al.robot_id = r.id
-                WHERE al.robot_id = ?
-                ORDER BY al.created_at DESC
-                LIMIT ?
-            """, (robot_id, limit))
-        else:
-            cursor.execute("""
-                SELECT al.*, r.name as robot_name
-                FROM activity_logs al
-                LEFT JOIN robots r ON al.robot_id = r.id
-                ORDER BY al.created_at DESC
-                LIMIT ?
-            """, (limit,))
-        
-        return [dict(row) for row in cursor.fetchall()]
+        _select_activity_logs(cursor, robot_id, limit)
+        return cursor.fetchall()
 
 
 def clear_activity_logs(robot_id: Optional[int] = None) -> bool:
     """Clear activity logs"""
+    # Entries queued before the clear must not reappear after it
+    flush_activity_logs()
     with get_db() as conn:
         cursor = conn.cursor()
         
@@ -847,67 +1299,103 @@ def clear_activity_logs(robot_id: Optional[int] = None) -> bool:
         return True
 
 
+def prune_activity_logs(older_than_days: int = 90, batch_size: int = 1000) -> int:
+    """Delete activity logs older than `older_than_days`, committing in batches"""
+    # created_at is CURRENT_TIMESTAMP text (UTC)
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    cutoff = cutoff.strftime('%Y-%m-%d %H:%M:%S')
+    flush_activity_logs()
+    removed = 0
+    with get_db() as conn:
+        cursor = conn.cursor()
+        while True:
+            # Short transactions keep the write lock free for live traffic
+            cursor.execute("""
+                DELETE FROM activity_logs WHERE id IN (
+                    SELECT id FROM activity_logs WHERE created_at < ? LIMIT ?
+                )
+            """, (cutoff, batch_size))
+            conn.commit()
+            removed += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                break
+        # Return freed pages to the OS (no-op unless auto_vacuum=INCREMENTAL)
+        cursor.execute("PRAGMA incremental_vacuum(1000)")
+        cursor.fetchall()
+    return removed
+
+
 # Violation operations
+_INSERT_VIOLATION_SQL = (
+    "INSERT INTO violations (robot_id, location, violation_type, image_path, severity, details) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+
+
 def add_violation(robot_id: int, location: str, violation_type: str, 
                   image_path: Optional[str] = None, severity: str = 'medium',
                   details: Optional[str] = None) -> int:
     """Add violation record"""
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO violations 
-            (robot_id, location, violation_type, image_path, severity, details)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (robot_id, location, violation_type, image_path, severity, details))
+        violation_id = _insert_returning_id(
+            cursor, _INSERT_VIOLATION_SQL,
+            (robot_id, location, violation_type, image_path, severity, details))
         conn.commit()
-        return cursor.lastrowid
+        return violation_id
 
 
-def get_violations(robot_id: Optional[int] = None, violation_type: Optional[str] = None,
-                   severity: Optional[str] = None, acknowledged: Optional[bool] = None,
-                   start_date: Optional[str] = None, end_date: Optional[str] = None,
-                   limit: int = 100) -> List[Dict]:
-    """Get violations with filters"""
+def add_violations_bulk(rows: List[tuple]) -> List[int]:
+    """
+    Add several violation records in one transaction and return their ids
+
+    Each row is (robot_id, location, violation_type, image_path, severity, details).
+    """
+    if not rows:
+        return []
     with get_db() as conn:
         cursor = conn.cursor()
-        
-        query = """
+        cursor.execute("BEGIN IMMEDIATE")
+        # executemany cannot return rows, so ids are collected per statement
+        ids = [_insert_returning_id(cursor, _INSERT_VIOLATION_SQL, row) for row in rows]
+        conn.commit()
+        return ids
+
+
+def get_violations_iter(robot_id: Optional[int] = None, violation_type: Optional[str] = None,
+                        severity: Optional[str] = None, acknowledged: Optional[bool] = None,
+                        start_date: Optional[str] = None, end_date: Optional[str] = None,
+                        limit: int = 100) -> Iterator[Dict]:
+    """Iterate over violations with filters"""
+    where, params = _where_clause([
+        ("v.robot_id = ?", robot_id or None),
+        ("v.violation_type = ?", violation_type or None),
+        ("v.severity = ?", severity or None),
+        ("v.acknowledged = ?", None if acknowledged is None else int(bool(acknowledged))),
+        ("v.timestamp >= ?", start_date or None),
+        ("v.timestamp <= ?", end_date or None),
+    ])
+    params.append(limit)
+
+    with get_db_readonly() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
             SELECT v.*, r.name as robot_name
             FROM violations v
             LEFT JOIN robots r ON v.robot_id = r.id
-            WHERE 1=1
-        """
-        params = []
-        
-        if robot_id:
-            query += " AND v.robot_id = ?"
-            params.append(robot_id)
-        
-        if violation_type:
-            query += " AND v.violation_type = ?"
-            params.append(violation_type)
+            {where}
+            ORDER BY v.timestamp DESC LIMIT ?
+        """, params)
+        yield from _iter_rows(cursor)
 
-        if severity:
-            query += " AND v.severity = ?"
-            params.append(severity)
-        
-        if acknowledged is not None:
-            query += " AND v.acknowledged = ?"
-            params.append(1 if acknowledged else 0)
 
-        if start_date:
-            query += " AND v.timestamp >= ?"
-            params.append(start_date)
-        
-        if end_date:
-            query += " AND v.timestamp <= ?"
-            params.append(end_date)
-        
-        query += " ORDER BY v.timestamp DESC LIMIT ?"
-        params.append(limit)
-        
-        cursor.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
+def get_violations(robot_id: Optional[int] = None, violation_type: Optional[str] = None,
+                   severity: Optional[str] = None, acknowledged: Optional[bool] = None,
+                   start_date: Optional[str] = None, end_date: Optional[str] = None,
+                   limit: int = 100) -> List[Dict]:
+    """Get violations with filters"""
+    return list(get_violations_iter(robot_id, violation_type, severity, acknowledged,
+                                    start_date, end_date, limit))
 
 
 def get_violation_summary(group_by: str = 'day', robot_id: Optional[int] = None,
@@ -923,9 +1411,19 @@ def get_violation_summary(group_by: str = 'day', robot_id: Optional[int] = None,
         'year': "%Y"
     }.get(group_by, "%Y-%m-%d")
 
-    with get_db() as conn:
+    where, params = _where_clause([
+        ("robot_id = ?", robot_id or None),
+        ("violation_type = ?", violation_type or None),
+        ("severity = ?", severity or None),
+        ("acknowledged = ?", None if acknowledged is None else int(bool(acknowledged))),
+        ("timestamp >= ?", start_date or None),
+        ("timestamp <= ?", end_date or None),
+    ])
+    params.append(limit)
+
+    with get_db_readonly() as conn:
         cursor = conn.cursor()
-        query = f"""
+        cursor.execute(f"""
             SELECT strftime('{group_format}', timestamp, 'localtime') as period,
                    COUNT(*) as total,
                    SUM(CASE WHEN severity = 'high' THEN 1 ELSE 0 END) as high_count,
@@ -933,130 +1431,67 @@ def get_violation_summary(group_by: str = 'day', robot_id: Optional[int] = None,
                    SUM(CASE WHEN severity = 'low' THEN 1 ELSE 0 END) as low_count,
                    SUM(CASE WHEN acknowledged = 1 THEN 1 ELSE 0 END) as acknowledged_count
             FROM violations
-            WHERE 1=1
-        """
-        params = []
-
-        if robot_id:
-            query += " AND robot_id = ?"
-            params.append(robot_id)
-        if violation_type:
-            query += " AND violation_type = ?"
-            params.append(violation_type)
-        if severity:
-            query += " AND severity = ?"
-            params.append(severity)
-        if acknowledged is not None:
-            query += " AND acknowledged = ?"
-            params.append(1 if acknowledged else 0)
-        if start_date:
-            query += " AND timestamp >= ?"
-            params.append(start_date)
-        if end_date:
-            query += " AND timestamp <= ?"
-            params.append(end_date)
-
-        query += " GROUP BY period ORDER BY period DESC LIMIT ?"
-        params.append(limit)
-
-        cursor.execute(query, params)
+            {where}
+            GROUP BY period ORDER BY period DESC LIMIT ?
+        """, params)
         return [dict(row) for row in cursor.fetchall()]
 
 
+# Must match idx_violations_pending's WHERE clause verbatim for SQLite to use it
+_PENDING_VIOLATION_SQL = "(acknowledged = 0 OR acknowledged IS NULL)"
+
+
 def get_violation_stats(robot_id: Optional[int] = None) -> Dict:
     """Get violation statistics"""
-    with get_db() as conn:
+    robot_filter = [("robot_id = ?", robot_id or None)]
+    where, params = _where_clause(robot_filter)
+
+    # Today's local-time bounds as UTC text, matching CURRENT_TIMESTAMP values,
+    # so "today" is a range scan on the timestamp indexes
+    today = datetime.now().astimezone().replace(hour=0, minute=0, second=0, microsecond=0)
+    today_start, today_end = (bound.astimezone(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+                              for bound in (today, today + timedelta(days=1)))
+    today_where, today_params = _where_clause(
+        robot_filter + [("timestamp >= ?", today_start), ("timestamp < ?", today_end)])
+
+    with get_db_readonly() as conn:
         cursor = conn.cursor()
         
-        # Total violations
-        if robot_id:
-            cursor.execute("SELECT COUNT(*) as total FROM violations WHERE robot_id = ?", (robot_id,))
-        else:
-            cursor.execute("SELECT COUNT(*) as total FROM violations")
-        total = cursor.fetchone()['total']
-        
-        # By type
-        if robot_id:
-            cursor.execute("""
-                SELECT violation_type, COUNT(*) as count 
-                FROM violations WHERE robot_id = ?
-                GROUP BY violation_type
-            """, (robot_id,))
-        else:
-            cursor.execute("""
-                SELECT violation_type, COUNT(*) as count 
-                FROM violations
-                GROUP BY violation_type
-            """)
-        by_type = {row['violation_type']: row['count'] for row in cursor.fetchall()}
-        
-        # By severity
-        if robot_id:
-            cursor.execute("""
-                SELECT severity, COUNT(*) as count 
-                FROM violations WHERE robot_id = ?
-                GROUP BY severity
-            """, (robot_id,))
-        else:
-            cursor.execute("""
-                SELECT severity, COUNT(*) as count 
-                FROM violations
-                GROUP BY severity
-            """)
-        by_severity = {row['severity']: row['count'] for row in cursor.fetchall()}
+        # Total, by type and by severity from one grouped pass
+        cursor.execute(f"""
+            SELECT violation_type, severity, COUNT(*) as count
+            FROM violations {where}
+            GROUP BY violation_type, severity
+        """, params)
+        total = 0
+        by_type = defaultdict(int)
+        by_severity = defaultdict(int)
+        for row in cursor.fetchall():
+            total += row['count']
+            by_type[row['violation_type']] += row['count']
+            by_severity[row['severity']] += row['count']
 
         # Today's violations
-        if robot_id:
-            cursor.execute("""
-                SELECT COUNT(*) as total
-                FROM violations
-                WHERE robot_id = ? AND date(timestamp, 'localtime') = date('now', 'localtime')
-            """, (robot_id,))
-        else:
-            cursor.execute("""
-                SELECT COUNT(*) as total
-                FROM violations
-                WHERE date(timestamp, 'localtime') = date('now', 'localtime')
-            """)
+        cursor.execute(f"SELECT COUNT(*) as total FROM violations {today_where}", today_params)
         today_total = cursor.fetchone()['total']
 
-        # Pending violations (not acknowledged)
-        if robot_id:
-            cursor.execute("""
-                SELECT COUNT(*) as total
-                FROM violations
-                WHERE robot_id = ? AND (acknowledged = 0 OR acknowledged IS NULL)
-            """, (robot_id,))
-        else:
-            cursor.execute("""
-                SELECT COUNT(*) as total
-                FROM violations
-                WHERE (acknowledged = 0 OR acknowledged IS NULL)
-            """)
-        pending_total = cursor.fetchone()['total']
-
-        # Pending high severity
-        if robot_id:
-            cursor.execute("""
-                SELECT COUNT(*) as total
-                FROM violations
-                WHERE robot_id = ? AND (acknowledged = 0 OR acknowledged IS NULL) AND severity = 'high'
-            """, (robot_id,))
-        else:
-            cursor.execute("""
-                SELECT COUNT(*) as total
-                FROM violations
-                WHERE (acknowledged = 0 OR acknowledged IS NULL) AND severity = 'high'
-            """)
-        pending_high = cursor.fetchone()['total']
+        # Pending (not acknowledged) violations, answered from the partial index
+        cursor.execute(f"""
+            SELECT COUNT(*) as total,
+                   COALESCE(SUM(severity = 'high'), 0) as high
+            FROM violations
+            {where} {'AND' if where else 'WHERE'} {_PENDING_VIOLATION_SQL}
+        """, params)
+        pending = cursor.fetchone()
         
         return {
             'total': total,
-            'by_type': by_type,
-            'by_severity': by_severity,
+            'by_type': dict(by_type),
+            'by_severity': dict(sorted(by_severity.items(),
+                                       key=lambda item: (item[0] is not None, item[0] or ''))),
             'today_total': today_total,
-            'pending_total': pending_total,
-            'pending_high': pending_high
+            'pending_total': pending['total'],
+            'pending_high': pending['high']
         }
 
 
@@ -1068,69 +1503,90 @@ def acknowledge_violation(violation_id: int, acknowledged_by: str) -> bool:
             UPDATE violations 
             SET acknowledged = 1, acknowledged_by = ?, acknowledged_at = ?
             WHERE id = ?
-        """, (acknowledged_by, datetime.now(), violation_id))
+        """, (acknowledged_by, datetime.now().isoformat(' '), violation_id))
         conn.commit()
         return cursor.rowcount > 0
 
 
 # Waypoint summary operations
+_INSERT_WAYPOINT_SUMMARY_SQL = '''
+    INSERT INTO waypoint_summaries
+    (robot_id, route_id, waypoint_name, timestamp,
+     total_people, total_violations, total_compliant,
+     viewports_json, yolo_payload_json, action_taken, notes)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def _waypoint_summary_row(robot_id: Optional[int], route_id: Optional[int], waypoint_name: str,
+                          summary: Dict, action_taken: Optional[str] = None,
+                          notes: Optional[str] = None) -> tuple:
+    """Build the parameter tuple for one waypoint_summaries insert"""
+    return (
+        robot_id,
+        route_id,
+        waypoint_name,
+        summary.get('timestamp'),
+        summary.get('total_people', 0),
+        summary.get('total_violations', 0),
+        summary.get('total_compliant', 0),
+        _dump_json(summary.get('viewports', {})),
+        _dump_json(summary.get('yolo_payload', {})),
+        action_taken,
+        notes
+    )
+
+
 def add_waypoint_summary(robot_id: Optional[int], route_id: Optional[int], waypoint_name: str,
                          summary: Dict, action_taken: Optional[str] = None,
                          notes: Optional[str] = None) -> int:
     """Add waypoint summary record"""
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO waypoint_summaries
-            (robot_id, route_id, waypoint_name, timestamp,
-             total_people, total_violations, total_compliant,
-             viewports_json, yolo_payload_json, action_taken, notes)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            robot_id,
-            route_id,
-            waypoint_name,
-            summary.get('timestamp'),
-            summary.get('total_people', 0),
-            summary.get('total_violations', 0),
-            summary.get('total_compliant', 0),
-            json.dumps(summary.get('viewports', {})),
-            json.dumps(summary.get('yolo_payload', {})),
-            action_taken,
-            notes
-        ))
+        cursor.execute(_INSERT_WAYPOINT_SUMMARY_SQL, _waypoint_summary_row(
+            robot_id, route_id, waypoint_name, summary, action_taken, notes))
         conn.commit()
         return cursor.lastrowid
 
 
+def add_waypoint_summaries_bulk(entries: List[tuple]) -> int:
+    """
+    Add several waypoint summaries in one transaction
+
+    Each entry holds add_waypoint_summary's positional arguments:
+    (robot_id, route_id, waypoint_name, summary[, action_taken[, notes]]).
+    """
+    if not entries:
+        return 0
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(_INSERT_WAYPOINT_SUMMARY_SQL,
+                           [_waypoint_summary_row(*entry) for entry in entries])
+        conn.commit()
+        return cursor.rowcount
+
+
 def get_waypoint_summaries(robot_id: Optional[int] = None, route_id: Optional[int] = None,
                            start_date: Optional[str] = None, end_date: Optional[str] = None,
                            limit: int = 100) -> List[Dict]:
     """Get waypoint summaries"""
-    with get_db() as conn:
+    where, params = _where_clause([
+        ("ws.robot_id = ?", robot_id or None),
+        ("ws.route_id = ?", route_id or None),
+        ("ws.timestamp >= ?", start_date or None),
+        ("ws.timestamp <= ?", end_date or None),
+    ])
+    params.append(limit)
+
+    with get_db_readonly() as conn:
         cursor = conn.cursor()
-        query = """
+        cursor.execute(f"""
             SELECT ws.*
             FROM waypoint_summaries ws
-            WHERE 1=1
-        """
-        params = []
-        if robot_id:
-            query += " AND ws.robot_id = ?"
-            params.append(robot_id)
-        if route_id:
-            query += " AND ws.route_id = ?"
-            params.append(route_id)
-        if start_date:
-            query += " AND ws.timestamp >= ?"
-            params.append(start_date)
-        if end_date:
-            query += " AND ws.timestamp <= ?"
-            params.append(end_date)
-        query += " ORDER BY ws.timestamp DESC LIMIT ?"
-        params.append(limit)
-        cursor.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
+            {where}
+            ORDER BY ws.timestamp DESC LIMIT ?
+        """, params)
+        return list(_iter_rows(cursor))
 
 
 # Schedule operations
@@ -1142,14 +1598,29 @@ def create_schedule(route_id: int, name: str, schedule_type: str,
         cursor.execute('''
             INSERT INTO schedules (route_id, name, schedule_type, schedule_config, enabled)
             VALUES (?, ?, ?, ?, ?)
-        ''', (route_id, name, schedule_type, json.dumps(schedule_config), enabled))
+        ''', (route_id, name, schedule_type, _dump_json(schedule_config), enabled))
         conn.commit()
         return cursor.lastrowid
 
 
+# Parsed schedule_config per schedule id, reused while the stored JSON text
+# is unchanged (the scheduler re-reads every enabled schedule on each tick).
+# The parsed dicts are shared between callers and must not be mutated.
+_schedule_config_cache: Dict[int, tuple] = {}
+
+
+def _parse_schedule_config(schedule_id: int, raw_config: str) -> Dict:
+    cached = _schedule_config_cache.get(schedule_id)
+    if cached is not None and cached[0] == raw_config:
+        return cached[1]
+    config = json.loads(raw_config)
+    _schedule_config_cache[schedule_id] = (raw_config, config)
+    return config
+
+
 def get_all_schedules(enabled_only: bool = False) -> List[Dict]:
     """Get all schedules"""
-    with get_db() as conn:
+    with get_db_readonly() as conn:
         cursor = conn.cursor()
         
         query = """
@@ -1169,14 +1640,15 @@ def get_all_schedules(enabled_only: bool = False) -> List[Dict]:
         
         # Parse schedule_config JSON
         for schedule in schedules:
-            schedule['schedule_config'] = json.loads(schedule['schedule_config'])
+            schedule['schedule_config'] = _parse_schedule_config(schedule['id'],
+                                                                 schedule['schedule_config'])
         
         return schedules
 
 
 def get_schedule_by_id(schedule_id: int) -> Optional[Dict]:
     """Get schedule by ID"""
-    with get_db() as conn:
+    with get_db_readonly() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             SELECT s.*, r.name as route_name, rb.name as robot_name
@@ -1190,12 +1662,19 @@ def get_schedule_by_id(schedule_id: int) -> Optional[Dict]:
             return None
         schedule = dict(row)
         try:
-            schedule['schedule_config'] = json.loads(schedule['schedule_config'])
+            schedule['schedule_config'] = _parse_schedule_config(schedule['id'],
+                                                                 schedule['schedule_config'])
         except Exception:
             schedule['schedule_config'] = {}
         return schedule
 
 
+# Columns update_schedule may write; anything else is ignored
+_SCHEDULE_UPDATABLE = frozenset({
+    'route_id', 'name', 'schedule_type', 'schedule_config', 'enabled', 'last_run_at',
+})
+
+
 def update_schedule(schedule_id: int, **kwargs) -> bool:
     """Update schedule"""
     if not kwargs:
@@ -1203,27 +1682,30 @@ def update_schedule(schedule_id: int, **kwargs) -> bool:
     
     # Convert schedule_config dict to JSON if present
     if 'schedule_config' in kwargs and isinstance(kwargs['schedule_config'], dict):
-        kwargs['schedule_config'] = json.dumps(kwargs['schedule_config'])
+        kwargs['schedule_config'] = _dump_json(kwargs['schedule_config'])
     
-    kwargs['updated_at'] = datetime.now()
+    columns = tuple(sorted(key for key in kwargs if key in _SCHEDULE_UPDATABLE))
+    if not columns:
+        return False
 
     with get_db() as conn:
         cursor = conn.cursor()
-        set_clause = ', '.join([f"{key} = ?" for key in kwargs.keys()])
-        values = list(kwargs.values()) + [schedule_id]
-        cursor.execute(f"UPDATE schedules SET {set_clause} WHERE id = ?", values)
+        values = [kwargs[column] for column in columns]
+        values.append(schedule_id)
+        cursor.execute(_get_update_sql('schedules', columns, touch='updated_at'), values)
         conn.commit()
+        _schedule_config_cache.pop(schedule_id, None)
         return cursor.rowcount > 0
 
 
 def update_schedule_last_run(schedule_id: int, run_time: Optional[datetime] = None) -> bool:
     """Update schedule last run time"""
-    if run_time is None:
-        run_time = datetime.now()
+    # last_run_at stays local time: the scheduler compares its date to datetime.now()
+    last_run_at = (run_time or datetime.now()).isoformat(' ')
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute("UPDATE schedules SET last_run_at = ?, updated_at = ? WHERE id = ?",
-                       (run_time, datetime.now(), schedule_id))
+        cursor.execute("UPDATE schedules SET last_run_at = ?, updated_at = CURRENT_TIMESTAMP "
+                       "WHERE id = ?", (last_run_at, schedule_id))
         conn.commit()
         return cursor.rowcount > 0
 
@@ -1234,6 +1716,7 @@ def delete_schedule(schedule_id: int) -> bool:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM schedules WHERE id = ?", (schedule_id,))
         conn.commit()
+        _schedule_config_cache.pop(schedule_id, None)
         return cursor.rowcount > 0
 
 
@@ -1264,7 +1747,7 @@ def update_schedule_run(run_id: int, status: str, message: Optional[str] = None)
 
 def get_schedule_runs(limit: int = 50) -> List[Dict]:
     """Get recent schedule runs"""
-    with get_db() as conn:
+    with get_db_readonly() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             SELECT sr.*, s.name as schedule_name, r.name as route_name, rb.name as robot_name
@@ -1275,7 +1758,7 @@ def get_schedule_runs(limit: int = 50) -> List[Dict]:
             ORDER BY sr.started_at DESC
             LIMIT ?
         ''', (limit,))
-        return [dict(row) for row in cursor.fetchall()]
+        return list(_iter_rows(cursor))
 
 
 # Detection session operations
@@ -1297,16 +1780,16 @@ def end_detection_session(session_id: int, violations_count: int) -> bool:
         cursor = conn.cursor()
         cursor.execute("""
             UPDATE detection_sessions 
-            SET ended_at = ?, status = 'completed', violations_count = ?
+            SET ended_at = CURRENT_TIMESTAMP, status = 'completed', violations_count = ?
             WHERE id = ?
-        """, (datetime.now(), violations_count, session_id))
+        """, (violations_count, session_id))
         conn.commit()
         return cursor.rowcount > 0
 
 
 def get_active_detection_session(robot_id: int) -> Optional[Dict]:
     """Get active detection session for robot"""
-    with get_db() as conn:
+    with get_db_readonly() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT * FROM detection_sessions 
@@ -1321,35 +1804,25 @@ def get_detection_sessions(robot_id: Optional[int] = None, status: Optional[str]
                           start_date: Optional[str] = None, end_date: Optional[str] = None,
                           limit: int = 100) -> List[Dict]:
     """Get detection sessions with filters"""
-    with get_db() as conn:
+    where, params = _where_clause([
+        ("ds.robot_id = ?", robot_id or None),
+        ("ds.status = ?", status or None),
+        ("ds.started_at >= ?", start_date or None),
+        ("ds.started_at <= ?", end_date or None),
+    ])
+    params.append(limit)
+
+    with get_db_readonly() as conn:
         cursor = conn.cursor()
-        query = """
+        cursor.execute(f"""
             SELECT ds.*, r.name as robot_name, rt.name as route_name
             FROM detection_sessions ds
             LEFT JOIN robots r ON ds.robot_id = r.id
             LEFT JOIN routes rt ON ds.route_id = rt.id
-            WHERE 1=1
-        """
-        params = []
-
-        if robot_id:
-            query += " AND ds.robot_id = ?"
-            params.append(robot_id)
-        if status:
-            query += " AND ds.status = ?"
-            params.append(status)
-        if start_date:
-            query += " AND ds.started_at >= ?"
-            params.append(start_date)
-        if end_date:
-            query += " AND ds.started_at <= ?"
-            params.append(end_date)
-
-        query += " ORDER BY ds.started_at DESC LIMIT ?"
-        params.append(limit)
-
-        cursor.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
+            {where}
+            ORDER BY ds.started_at DESC LIMIT ?
+        """, params)
+        return list(_iter_rows(cursor))
 
 
 # Patrol history operations
@@ -1365,23 +1838,30 @@ def start_patrol_history(robot_id: int, route_id: int) -> int:
         return cursor.lastrowid
 
 
+# Columns update_patrol_history may write; anything else is ignored
+_PATROL_HISTORY_UPDATABLE = frozenset({
+    'robot_id', 'route_id', 'status', 'started_at', 'ended_at', 'details',
+})
+
+
 def update_patrol_history(history_id: int, **kwargs) -> bool:
     """Update patrol history"""
-    if not kwargs:
+    columns = tuple(sorted(key for key in kwargs if key in _PATROL_HISTORY_UPDATABLE))
+    if not columns:
         return False
     
     with get_db() as conn:
         cursor = conn.cursor()
-        set_clause = ', '.join([f"{key} = ?" for key in kwargs.keys()])
-        values = list(kwargs.values()) + [history_id]
-        cursor.execute(f"UPDATE patrol_history SET {set_clause} WHERE id = ?", values)
+        values = [kwargs[column] for column in columns]
+        values.append(history_id)
+        cursor.execute(_get_update_sql('patrol_history', columns), values)
         conn.commit()
         return cursor.rowcount > 0
 
 
 def get_patrol_history(robot_id: Optional[int] = None, limit: int = 50) -> List[Dict]:
     """Get patrol history"""
-    with get_db() as conn:
+    with get_db_readonly() as conn:
         cursor = conn.cursor()
         
         if robot_id:
@@ -1402,12 +1882,12 @@ def get_patrol_history(robot_id: Optional[int] = None, limit: int = 50) -> List[
                 ORDER BY ph.started_at DESC LIMIT ?
             """, (limit,))
         
-        return [dict(row) for row in cursor.fetchall()]
+        return list(_iter_rows(cursor))
 
 
 def get_active_patrol_history(robot_id: int) -> Optional[Dict]:
     """Get the most recent running patrol history entry for a robot"""
-    with get_db() as conn:
+    with get_db_readonly() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT * FROM patrol_history
@@ -1423,6 +1903,151 @@ def get_active_patrol_history(robot_id: int) -> Optional[Dict]:
 # YOLO Inspection Patrol Operations
 # ============================================================================
 
+_INSERT_INSPECTION_ROUTE_SQL = '''
+    INSERT INTO yolo_inspection_routes
+    (name, robot_id, loop_count, return_location, pipeline_start_timeout)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+_SELECT_ALL_INSPECTION_ROUTES_SQL = '''
+    SELECT ir.*, r.name as robot_name
+    FROM yolo_inspection_routes ir
+    JOIN robots r ON ir.robot_id = r.id
+    ORDER BY ir.created_at DESC
+'''
+
+_SELECT_INSPECTION_ROUTES_BY_ROBOT_SQL = '''
+    SELECT ir.*, r.name as robot_name
+    FROM yolo_inspection_routes ir
+    JOIN robots r ON ir.robot_id = r.id
+    WHERE ir.robot_id = ?
+    ORDER BY ir.created_at DESC
+'''
+
+_SELECT_INSPECTION_ROUTE_BY_ID_SQL = '''
+    SELECT ir.*, r.name as robot_name
+    FROM yolo_inspection_routes ir
+    JOIN robots r ON ir.robot_id = r.id
+    WHERE ir.id = ?
+'''
+
+_SELECT_INSPECTION_WAYPOINTS_SQL = '''
+    SELECT * FROM yolo_inspection_waypoints
+    WHERE inspection_route_id = ?
+    ORDER BY sequence_order
+'''
+
+_INSERT_INSPECTION_SESSION_SQL = '''
+    INSERT INTO yolo_inspection_sessions
+    (robot_id, inspection_route_id, pipeline_start_status)
+    VALUES (?, ?, ?)
+'''
+
+_INSERT_WAYPOINT_INSPECTION_SQL = '''
+    INSERT INTO yolo_waypoint_inspections
+    (inspection_session_id, waypoint_name, violations_detected,
+     people_detected, compliant_detected, viewports_json, result,
+     timestamp_end, duration_seconds)
+    VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?)
+'''
+
+_SELECT_WAYPOINT_INSPECTIONS_SQL = '''
+    SELECT * FROM yolo_waypoint_inspections
+    WHERE inspection_session_id = ?
+    ORDER BY timestamp_start
+'''
+
+_INSERT_INSPECTION_WAYPOINT_SQL = '''
+    INSERT INTO yolo_inspection_waypoints
+    (inspection_route_id, waypoint_name, sequence_order, checking_duration,
+     violation_threshold, tts_start, tts_no_violation, tts_violation)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+_UPDATE_INSPECTION_WAYPOINT_SQL = '''
+    UPDATE yolo_inspection_waypoints
+    SET waypoint_name = ?, sequence_order = ?, checking_duration = ?,
+        violation_threshold = ?, tts_start = ?, tts_no_violation = ?, tts_violation = ?
+    WHERE id = ?
+'''
+
+
+def _inspection_waypoint_rows(route_id: int, waypoints: List[Dict]) -> List[tuple]:
+    """Build yolo_inspection_waypoints parameter rows"""
+    return [
+        (route_id,
+         waypoint.get('waypoint_name'),
+         waypoint.get('sequence_order', 0),
+         waypoint.get('checking_duration', 30),
+         waypoint.get('violation_threshold', 0),
+         waypoint.get('tts_start', 'Starting inspection at {waypoint}'),
+         waypoint.get('tts_no_violation', 'No violations detected at {waypoint}'),
+         waypoint.get('tts_violation', 'Safety violations detected: {count}'))
+        for waypoint in waypoints
+    ]
+
+
+def _replace_inspection_waypoints(cursor, route_id: int, waypoints: List[Dict]) -> None:
+    """Rewrite a route's waypoints, touching only rows that actually change
+
+    Existing rows are paired with the new list by position; matching rows
+    are left alone, differing ones updated in place, extras inserted and
+    leftovers deleted.
+    """
+    cursor.row_factory = None  # rows are only compared as plain tuples
+    cursor.execute("""
+        SELECT id, inspection_route_id, waypoint_name, sequence_order, checking_duration,
+               violation_threshold, tts_start, tts_no_violation, tts_violation
+        FROM yolo_inspection_waypoints
+        WHERE inspection_route_id = ?
+        ORDER BY sequence_order, id
+    """, (route_id,))
+    existing = cursor.fetchall()
+    rows = _inspection_waypoint_rows(route_id, waypoints)
+
+    cursor.executemany(_UPDATE_INSPECTION_WAYPOINT_SQL, [
+        row[1:] + (old[0],) for old, row in zip(existing, rows) if old[1:] != row
+    ])
+    cursor.executemany(_INSERT_INSPECTION_WAYPOINT_SQL, rows[len(existing):])
+    cursor.executemany("DELETE FROM yolo_inspection_waypoints WHERE id = ?",
+                       [(old[0],) for old in existing[len(rows):]])
+
+
+# Dashboards poll the inspection route list, and routes rarely change.
+# Results are kept for a few seconds and dropped whenever a route is written.
+INSPECTION_ROUTE_CACHE_TTL = 5.0
+_inspection_route_cache_lock = threading.Lock()
+_inspection_route_cache: Dict[tuple, tuple] = {}
+_inspection_route_cache_generation = 0
+
+
+def clear_inspection_route_cache() -> None:
+    """Drop cached inspection routes (call after writing routes outside this module)"""
+    global _inspection_route_cache_generation
+    with _inspection_route_cache_lock:
+        _inspection_route_cache.clear()
+        _inspection_route_cache_generation += 1
+
+
+def _cached_inspection_routes(key: tuple, loader):
+    """Return loader() memoized under key for INSPECTION_ROUTE_CACHE_TTL seconds"""
+    now = time.monotonic()
+    with _inspection_route_cache_lock:
+        entry = _inspection_route_cache.get(key)
+        if entry and entry[0] == DATABASE_PATH and now - entry[1] < INSPECTION_ROUTE_CACHE_TTL:
+            return entry[2]
+        generation = _inspection_route_cache_generation
+
+    value = loader()
+
+    with _inspection_route_cache_lock:
+        # Skip storing if a write invalidated the cache while we were loading
+        if generation == _inspection_route_cache_generation:
+            _inspection_route_cache[key] = (DATABASE_PATH, now, value)
+    return value
+
+
 def create_inspection_route(name: str, robot_id: int, waypoints: List[Dict],
                             loop_count: int = 1, return_location: Optional[str] = None,
                             pipeline_timeout: int = 30) -> int:
@@ -1430,83 +2055,59 @@ def create_inspection_route(name: str, robot_id: int, waypoints: List[Dict],
     with get_db() as conn:
         cursor = conn.cursor()
 
-        # Insert route
-        cursor.execute("""
-            INSERT INTO yolo_inspection_routes
-            (name, robot_id, loop_count, return_location, pipeline_start_timeout)
-            VALUES (?, ?, ?, ?, ?)
-        """, (name, robot_id, loop_count, return_location, pipeline_timeout))
+        cursor.execute("BEGIN IMMEDIATE")
 
-        route_id = cursor.lastrowid
+        # Insert route
+        route_id = _insert_returning_id(
+            cursor, _INSERT_INSPECTION_ROUTE_SQL,
+            (name, robot_id, loop_count, return_location, pipeline_timeout))
 
         # Insert waypoints
-        for waypoint in waypoints:
-            cursor.execute("""
-                INSERT INTO yolo_inspection_waypoints
-                (inspection_route_id, waypoint_name, sequence_order, checking_duration,
-                 violation_threshold, tts_start, tts_no_violation, tts_violation)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                route_id,
-                waypoint.get('waypoint_name'),
-                waypoint.get('sequence_order', 0),
-                waypoint.get('checking_duration', 30),
-                waypoint.get('violation_threshold', 0),
-                waypoint.get('tts_start', 'Starting inspection at {waypoint}'),
-                waypoint.get('tts_no_violation', 'No violations detected at {waypoint}'),
-                waypoint.get('tts_violation', 'Safety violations detected: {count}')
-            ))
+        cursor.executemany(_INSERT_INSPECTION_WAYPOINT_SQL,
+                           _inspection_waypoint_rows(route_id, waypoints))
 
         conn.commit()
-        return route_id
+    clear_inspection_route_cache()
+    return route_id
 
 
 def get_inspection_routes(robot_id: Optional[int] = None) -> List[Dict]:
-    """Get all YOLO inspection routes"""
-    with get_db() as conn:
+    """Get all YOLO inspection routes (cached briefly; treat as read-only)"""
+    return _cached_inspection_routes(('routes', robot_id or None),
+                                     lambda: _load_inspection_routes(robot_id))
+
+
+def _load_inspection_routes(robot_id: Optional[int]) -> List[Dict]:
+    with get_db_readonly() as conn:
         cursor = conn.cursor()
 
         if robot_id:
-            cursor.execute("""
-                SELECT ir.*, r.name as robot_name
-                FROM yolo_inspection_routes ir
-                JOIN robots r ON ir.robot_id = r.id
-                WHERE ir.robot_id = ?
-                ORDER BY ir.created_at DESC
-            """, (robot_id,))
+            cursor.execute(_SELECT_INSPECTION_ROUTES_BY_ROBOT_SQL, (robot_id,))
         else:
-            cursor.execute("""
-                SELECT ir.*, r.name as robot_name
-                FROM yolo_inspection_routes ir
-                JOIN robots r ON ir.robot_id = r.id
-                ORDER BY ir.created_at DESC
-            """)
+            cursor.execute(_SELECT_ALL_INSPECTION_ROUTES_SQL)
 
         routes = [dict(row) for row in cursor.fetchall()]
 
-        # Fetch waypoints for each route
+        # Fetch waypoints for all routes in one query
+        waypoints = _fetch_children(cursor, 'yolo_inspection_waypoints', 'inspection_route_id',
+                                    [route['id'] for route in routes])
         for route in routes:
-            cursor.execute("""
-                SELECT * FROM yolo_inspection_waypoints
-                WHERE inspection_route_id = ?
-                ORDER BY sequence_order
-            """, (route['id'],))
-            route['waypoints'] = [dict(row) for row in cursor.fetchall()]
+            route['waypoints'] = waypoints.get(route['id'], [])
 
         return routes
 
 
 def get_inspection_route(route_id: int) -> Optional[Dict]:
-    """Get a specific YOLO inspection route with waypoints"""
-    with get_db() as conn:
+    """Get a specific YOLO inspection route with waypoints (cached briefly; treat as read-only)"""
+    return _cached_inspection_routes(('route', route_id),
+                                     lambda: _load_inspection_route(route_id))
+
+
+def _load_inspection_route(route_id: int) -> Optional[Dict]:
+    with get_db_readonly() as conn:
         cursor = conn.cursor()
 
-        cursor.execute("""
-            SELECT ir.*, r.name as robot_name
-            FROM yolo_inspection_routes ir
-            JOIN robots r ON ir.robot_id = r.id
-            WHERE ir.id = ?
-        """, (route_id,))
+        cursor.execute(_SELECT_INSPECTION_ROUTE_BY_ID_SQL, (route_id,))
 
         row = cursor.fetchone()
         if not row:
@@ -1515,11 +2116,7 @@ def get_inspection_route(route_id: int) -> Optional[Dict]:
         route = dict(row)
 
         # Fetch waypoints
-        cursor.execute("""
-            SELECT * FROM yolo_inspection_waypoints
-            WHERE inspection_route_id = ?
-            ORDER BY sequence_order
-        """, (route_id,))
+        cursor.execute(_SELECT_INSPECTION_WAYPOINTS_SQL, (route_id,))
 
         route['waypoints'] = [dict(row) for row in cursor.fetchall()]
 
@@ -1534,39 +2131,26 @@ def update_inspection_route(route_id: int, name: Optional[str] = None,
         with get_db() as conn:
             cursor = conn.cursor()
 
-            if name:
-                cursor.execute("UPDATE yolo_inspection_routes SET name = ? WHERE id = ?",
-                             (name, route_id))
+            # Take the write lock up front: the waypoint diff reads before it writes
+            cursor.execute("BEGIN IMMEDIATE")
 
+            fields = {}
+            if name:
+                fields['name'] = name
             if loop_count is not None:
-                cursor.execute("UPDATE yolo_inspection_routes SET loop_count = ? WHERE id = ?",
-                             (loop_count, route_id))
+                fields['loop_count'] = loop_count
+
+            if fields:
+                columns = tuple(fields)
+                cursor.execute(_get_update_sql('yolo_inspection_routes', columns),
+                               [*fields.values(), route_id])
 
             if waypoints is not None:
-                # Delete existing waypoints
-                cursor.execute("DELETE FROM yolo_inspection_waypoints WHERE inspection_route_id = ?",
-                             (route_id,))
-
-                # Insert new waypoints
-                for waypoint in waypoints:
-                    cursor.execute("""
-                        INSERT INTO yolo_inspection_waypoints
-                        (inspection_route_id, waypoint_name, sequence_order, checking_duration,
-                         violation_threshold, tts_start, tts_no_violation, tts_violation)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        route_id,
-                        waypoint.get('waypoint_name'),
-                        waypoint.get('sequence_order', 0),
-                        waypoint.get('checking_duration', 30),
-                        waypoint.get('violation_threshold', 0),
-                        waypoint.get('tts_start', 'Starting inspection at {waypoint}'),
-                        waypoint.get('tts_no_violation', 'No violations detected at {waypoint}'),
-                        waypoint.get('tts_violation', 'Safety violations detected: {count}')
-                    ))
+                _replace_inspection_waypoints(cursor, route_id, waypoints)
 
             conn.commit()
-            return True
+        clear_inspection_route_cache()
+        return True
     except Exception:
         return False
 
@@ -1578,7 +2162,8 @@ def delete_inspection_route(route_id: int) -> bool:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM yolo_inspection_routes WHERE id = ?", (route_id,))
             conn.commit()
-            return True
+        clear_inspection_route_cache()
+        return True
     except Exception:
         return False
 
@@ -1588,49 +2173,34 @@ def create_inspection_session(robot_id: int, route_id: int,
     """Create a new inspection session"""
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO yolo_inspection_sessions
-            (robot_id, inspection_route_id, pipeline_start_status)
-            VALUES (?, ?, ?)
-        """, (robot_id, route_id, pipeline_status))
+        session_id = _insert_returning_id(cursor, _INSERT_INSPECTION_SESSION_SQL,
+                                          (robot_id, route_id, pipeline_status))
         conn.commit()
-        return cursor.lastrowid
+        return session_id
 
 
 def update_inspection_session(session_id: int, status: Optional[str] = None,
                               waypoints_inspected: Optional[int] = None,
                               violations_found: Optional[int] = None) -> bool:
     """Update inspection session"""
+    fields = {}
+    if status:
+        fields['status'] = status
+    if waypoints_inspected is not None:
+        fields['total_waypoints_inspected'] = waypoints_inspected
+    if violations_found is not None:
+        fields['total_violations_found'] = violations_found
+    if not fields:
+        return True
+
+    # One memoized statement per field combination, so each variant stays
+    # in the connection's statement cache
+    touch = 'ended_at' if status in ('completed', 'stopped', 'error') else None
+    sql = _get_update_sql('yolo_inspection_sessions', tuple(fields), touch=touch)
     try:
         with get_db() as conn:
-            cursor = conn.cursor()
-
-            updates = []
-            params = []
-
-            if status:
-                updates.append("status = ?")
-                params.append(status)
-                if status in ('completed', 'stopped', 'error'):
-                    updates.append("ended_at = CURRENT_TIMESTAMP")
-
-            if waypoints_inspected is not None:
-                updates.append("total_waypoints_inspected = ?")
-                params.append(waypoints_inspected)
-
-            if violations_found is not None:
-                updates.append("total_violations_found = ?")
-                params.append(violations_found)
-
-            if updates:
-                params.append(session_id)
-                cursor.execute(f"""
-                    UPDATE yolo_inspection_sessions
-                    SET {', '.join(updates)}
-                    WHERE id = ?
-                """, params)
-                conn.commit()
-
+            conn.execute(sql, [*fields.values(), session_id])
+            conn.commit()
             return True
     except Exception:
         return False
@@ -1645,68 +2215,61 @@ def create_waypoint_inspection(session_id: int, waypoint_name: str,
     with get_db() as conn:
         cursor = conn.cursor()
 
-        viewports_json = json.dumps(viewports) if viewports else None
+        viewports_json = _dump_json(viewports) if viewports else None
 
-        cursor.execute("""
-            INSERT INTO yolo_waypoint_inspections
-            (inspection_session_id, waypoint_name, violations_detected,
-             people_detected, compliant_detected, viewports_json, result,
-             timestamp_end, duration_seconds)
-            VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?)
-        """, (session_id, waypoint_name, violations, people, compliant,
-              viewports_json, result, duration))
+        inspection_id = _insert_returning_id(
+            cursor, _INSERT_WAYPOINT_INSPECTION_SQL,
+            (session_id, waypoint_name, violations, people, compliant,
+             viewports_json, result, duration))
 
         conn.commit()
-        return cursor.lastrowid
+        return inspection_id
+
+
+def get_inspection_sessions_iter(robot_id: Optional[int] = None,
+                                 limit: int = 50) -> Iterator[Dict]:
+    """Iterate over inspection sessions with route info"""
+    where, params = _where_clause([("s.robot_id = ?", robot_id or None)])
+    params.append(limit)
+
+    with get_db_readonly() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT
+                s.*,
+                r.name as route_name,
+                rob.name as robot_name
+            FROM yolo_inspection_sessions s
+            JOIN yolo_inspection_routes r ON s.inspection_route_id = r.id
+            JOIN robots rob ON s.robot_id = rob.id
+            {where}
+            ORDER BY s.started_at DESC
+            LIMIT ?
+        """, params)
+        yield from _iter_rows(cursor)
 
 
 def get_inspection_sessions(robot_id: Optional[int] = None,
                             limit: int = 50) -> List[Dict]:
     """Get inspection sessions with route info"""
-    with get_db() as conn:
-        cursor = conn.cursor()
-
-        if robot_id:
-            cursor.execute("""
-                SELECT
-                    s.*,
-                    r.name as route_name,
-                    rob.name as robot_name
-                FROM yolo_inspection_sessions s
-                JOIN yolo_inspection_routes r ON s.inspection_route_id = r.id
-                JOIN robots rob ON s.robot_id = rob.id
-                WHERE s.robot_id = ?
-                ORDER BY s.started_at DESC
-                LIMIT ?
-            """, (robot_id, limit))
-        else:
-            cursor.execute("""
-                SELECT
-                    s.*,
-                    r.name as route_name,
-                    rob.name as robot_name
-                FROM yolo_inspection_sessions s
-                JOIN yolo_inspection_routes r ON s.inspection_route_id = r.id
-                JOIN robots rob ON s.robot_id = rob.id
-                ORDER BY s.started_at DESC
-                LIMIT ?
-            """, (limit,))
+    return list(get_inspection_sessions_iter(robot_id, limit))
 
-        return [dict(row) for row in cursor.fetchall()]
 
+def get_waypoint_inspections(session_id: int, parse_viewports: bool = True) -> List[Dict]:
+    """Get all waypoint inspections for a session
 
-def get_waypoint_inspections(session_id: int) -> List[Dict]:
-    """Get all waypoint inspections for a session"""
-    with get_db() as conn:
+    Pass parse_viewports=False when only the summary columns are needed;
+    rows then keep the raw viewports_json text and get no 'viewports' key.
+    """
+    with get_db_readonly() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT * FROM yolo_waypoint_inspections
-            WHERE inspection_session_id = ?
-            ORDER BY timestamp_start
-        """, (session_id,))
+        cursor.execute(_SELECT_WAYPOINT_INSPECTIONS_SQL, (session_id,))
 
         inspections = [dict(row) for row in cursor.fetchall()]
 
+        if not parse_viewports:
+            return inspections
+
         # Parse viewports JSON
         for inspection in inspections:
             if inspection['viewports_json']:
@@ -4,17 +4,28 @@ Handles patrol state machine and route execution
 """
 
 import time
+import base64
+import itertools
 import threading
 import logging
 from typing import Dict, List, Optional, Callable, Any
 from enum import Enum
 from datetime import datetime
+from functools import lru_cache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _as_int(value, default: int) -> int:
+    """Coerce a setting value to int, falling back to default"""
+    try:
+        return int(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
 class PatrolState(Enum):
     """Patrol states"""
     IDLE = "idle"
@@ -26,6 +37,27 @@ class PatrolState(Enum):
     ERROR = "error"
 
 
+# Full-screen text page; the text itself goes between the two halves
+_TEXT_DISPLAY_HTML_BEFORE = (
+    b'<html><head><meta charset="UTF-8"></head>'
+    b"<body style='display:flex;justify-content:center;align-items:center;"
+    b"height:100vh;font-size:48px;text-align:center;"
+    b"background-color:#000;color:#fff;padding:20px;'>"
+)
+_TEXT_DISPLAY_HTML_AFTER = b'</body></html>'
+
+
+@lru_cache(maxsize=128)
+def _text_display_data_uri(content: str) -> str:
+    """Data URI showing `content` as full-screen text (built once per distinct text)"""
+    payload = _TEXT_DISPLAY_HTML_BEFORE + content.encode() + _TEXT_DISPLAY_HTML_AFTER
+    return 'data:text/html;base64,' + base64.b64encode(payload).decode('ascii')
+
+
+# States a patrol can be stopped from (anything still active)
+_STOPPABLE_STATES = frozenset(PatrolState) - {PatrolState.IDLE, PatrolState.STOPPED}
+
+
 class PatrolManager:
     """Manages patrol execution for a single robot"""
     
@@ -56,6 +88,10 @@ class PatrolManager:
         self.current_waypoint = None
         self.is_paused = False
         self.stop_requested = False
+        # Event mirrors of the flags above so the patrol thread can block on them
+        self.not_paused = threading.Event()
+        self.not_paused.set()
+        self.stop_event = threading.Event()
         
         # Loop tracking
         raw_loop_count = route.get('loop_count', 1)
@@ -67,19 +103,16 @@ class PatrolManager:
         self.is_infinite_loop = self.loop_count <= 0
         
         # Battery monitoring
-        self.low_battery_threshold = int(settings.get('low_battery_threshold', 10))
-        self.low_battery_action = settings.get('low_battery_action', 'complete_current')
-        self.home_base_location = settings.get('home_base_location', 'home base')
         self.current_battery_level = 100
         self.is_low_battery = False
         self.return_after_current = False
 
-        # Return location
-        self.return_location = route.get('return_location') or self.home_base_location
+        self._load_settings()
         
         # Patrol thread
         self.patrol_thread: Optional[threading.Thread] = None
-        self.lock = threading.Lock()
+        # Reentrant so control methods can call _transition() while holding it
+        self.lock = threading.RLock()
         
         # Movement speed
         self.movement_speed = float(settings.get('default_movement_speed', 0.5))
@@ -87,83 +120,140 @@ class PatrolManager:
         # Waypoint tracking
         self.waiting_for_arrival = False
         self.last_goto_time = None
+        # Set when a goto finishes (or on stop/pause) to wake the waiting thread
+        self.arrival_event = threading.Event()
+        # (event_type, status) -> handler; a None status matches any status
+        self._event_handlers = {
+            ('goto', 'start'): self._handle_goto_start,
+            ('goto', 'complete'): self._handle_arrival,
+            ('goto', 'abort'): self._handle_goto_failure,
+            ('goto', 'fail'): self._handle_goto_failure,
+            ('arrived', None): self._handle_arrival,
+        }
     
+    def _load_settings(self):
+        """Parse the settings used during a patrol once, instead of per waypoint"""
+        settings = self.settings
+        self.low_battery_threshold = _as_int(settings.get('low_battery_threshold'), 10)
+        self.low_battery_action = settings.get('low_battery_action', 'complete_current')
+        self.home_base_location = settings.get('home_base_location', 'home base')
+        self.return_location = self.route.get('return_location') or self.home_base_location
+
+        self.waypoint_timeout = _as_int(settings.get('waypoint_timeout'), 60)
+        self.waypoint_max_retries = _as_int(settings.get('waypoint_max_retries'), 2)
+        self.arrival_delay = _as_int(settings.get('arrival_action_delay_seconds'), 2)
+        self.tts_wait_seconds = _as_int(settings.get('tts_wait_seconds'), 3)
+        self.display_wait_seconds = _as_int(settings.get('display_wait_seconds'), 2)
+        self.webview_close_delay = _as_int(settings.get('webview_close_delay_seconds'), 0)
+        self.detection_timeout = _as_int(settings.get('detection_timeout_seconds'), 30)
+        self.no_violation_seconds = _as_int(settings.get('no_violation_seconds'), 5)
+
+        self.patrolling_webview_url = settings.get('patrolling_webview_url')
+        self.low_battery_webview_url = settings.get('low_battery_webview_url') or ''
+        self.no_violation_webview_url = settings.get('no_violation_webview_url')
+        self.no_violation_tts = settings.get('no_violation_tts')
+
+    def update_settings(self, settings: Dict):
+        """Replace the settings used by this patrol"""
+        self.settings = settings
+        self._load_settings()
+
+    def _transition(self, allowed, new: PatrolState) -> bool:
+        """Atomically move to `new` if the current state is in `allowed`"""
+        with self.lock:
+            if self.state not in allowed:
+                return False
+            self.state = new
+            return True
+
     def start(self):
         """Start patrol execution"""
+        if self.total_waypoints == 0:
+            logger.error("Cannot start patrol - no waypoints in route")
+            self._emit_error("No waypoints in route")
+            return False
+
         with self.lock:
-            if self.state != PatrolState.IDLE:
+            if not self._transition({PatrolState.IDLE}, PatrolState.RUNNING):
                 logger.warning(f"Cannot start patrol - current state: {self.state}")
                 return False
-            
-            if self.total_waypoints == 0:
-                logger.error("Cannot start patrol - no waypoints in route")
-                self._emit_error("No waypoints in route")
-                return False
-            
-            self.state = PatrolState.RUNNING
+
             self.current_waypoint_index = 0
             self.stop_requested = False
+            self.stop_event.clear()
             self.is_paused = False
-            
+            self.not_paused.set()
+
             # Start patrol thread
             self.patrol_thread = threading.Thread(target=self._patrol_loop, daemon=True)
             self.patrol_thread.start()
-            
-            self._emit_status_update()
-            logger.info(f"Started patrol for robot {self.robot_id}")
-            return True
+
+        # Callbacks run outside the lock; they may emit over Socket.IO
+        self._emit_status_update()
+        logger.info(f"Started patrol for robot {self.robot_id}")
+        return True
     
     def stop(self):
         """Stop patrol execution"""
         with self.lock:
-            if self.state == PatrolState.IDLE or self.state == PatrolState.STOPPED:
+            if not self._transition(_STOPPABLE_STATES, PatrolState.STOPPED):
                 return False
             
-            self.stop_requested = True
-            self.state = PatrolState.STOPPED
+            self._request_stop()
             
-            # Stop robot movement
+            # Stop robot movement (kept under the lock so control commands
+            # reach the robot in the order they were accepted)
             self.mqtt_client.stop_movement()
-            
-            self._emit_status_update()
-            logger.info(f"Stopped patrol for robot {self.robot_id}")
-            return True
+
+        self._emit_status_update()
+        logger.info(f"Stopped patrol for robot {self.robot_id}")
+        return True
     
     def pause(self):
         """Pause patrol execution"""
         with self.lock:
-            if self.state not in (PatrolState.RUNNING, PatrolState.WAITING):
+            if not self._transition({PatrolState.RUNNING, PatrolState.WAITING},
+                                    PatrolState.PAUSED):
                 return False
             
             self.is_paused = True
-            self.state = PatrolState.PAUSED
+            self.not_paused.clear()
+            self.arrival_event.set()
             
             # Stop robot movement
             self.mqtt_client.stop_movement()
-            
-            self._emit_status_update()
-            logger.info(f"Paused patrol for robot {self.robot_id}")
-            return True
+
+        self._emit_status_update()
+        logger.info(f"Paused patrol for robot {self.robot_id}")
+        return True
     
     def resume(self):
         """Resume patrol execution"""
         with self.lock:
-            if self.state != PatrolState.PAUSED:
+            if not self._transition({PatrolState.PAUSED}, PatrolState.RUNNING):
                 return False
             
             self.is_paused = False
-            self.state = PatrolState.RUNNING
+            self.not_paused.set()
 
             if self.current_waypoint and self.waiting_for_arrival:
                 try:
                     self.mqtt_client.goto_waypoint(self.current_waypoint.get('waypoint_name'))
                 except Exception as exc:
                     logger.error(f"Failed to resume goto: {exc}")
-            
-            self._emit_status_update()
-            logger.info(f"Resumed patrol for robot {self.robot_id}")
-            return True
+
+        self._emit_status_update()
+        logger.info(f"Resumed patrol for robot {self.robot_id}")
+        return True
     
+    def _request_stop(self):
+        """Flag the patrol thread to stop and wake it from any wait"""
+        self.stop_requested = True
+        self.stop_event.set()
+        # Release a paused thread too, so it can see the stop and exit
+        self.not_paused.set()
+        self.arrival_event.set()
+
     def set_speed(self, speed: float):
         """Set movement speed"""
         self.movement_speed = max(0.1, min(1.0, speed))
@@ -190,46 +280,55 @@ class PatrolManager:
     
     def on_waypoint_event(self, event_type: str, location: str, status: str):
         """Handle waypoint navigation events from robot"""
-        logger.info(f"Waypoint event: {event_type}, location: {location}, status: {status}")
-        
-        if event_type == "goto":
-            if status == "start":
-                self.waiting_for_arrival = True
-                self.last_goto_time = time.time()
-            elif status == "complete":
-                self.waiting_for_arrival = False
-                self._on_waypoint_arrival()
-            elif status == "abort" or status == "fail":
-                self.waiting_for_arrival = False
-                self._emit_error(f"Failed to reach waypoint: {location}")
+        logger.info("Waypoint event: %s, location: %s, status: %s", event_type, location, status)
         
-        elif event_type == "arrived":
-            self.waiting_for_arrival = False
-            self._on_waypoint_arrival()
+        handlers = self._event_handlers
+        handler = handlers.get((event_type, status)) or handlers.get((event_type, None))
+        if handler:
+            handler(location)
+
+    def _handle_goto_start(self, location: str):
+        self.waiting_for_arrival = True
+        self.last_goto_time = time.time()
+
+    def _handle_arrival(self, location: str):
+        self.waiting_for_arrival = False
+        self.arrival_event.set()
+        self._on_waypoint_arrival()
+
+    def _handle_goto_failure(self, location: str):
+        self.waiting_for_arrival = False
+        self.arrival_event.set()
+        self._emit_error(f"Failed to reach waypoint: {location}")
     
     def _patrol_loop(self):
         """Main patrol execution loop with support for multiple loops"""
         try:
-            # Initialize loop counter
-            self.current_loop = 1
-            keep_looping = True
-            
-            while keep_looping and not self.stop_requested:
-                logger.info(f"Starting loop {self.current_loop}" + 
-                          (f" of {self.loop_count}" if not self.is_infinite_loop else " (infinite)"))
-                
-                # Reset waypoint index for new loop
-                self.current_waypoint_index = 0
+            if self.is_infinite_loop:
+                loop_numbers = itertools.count(1)
+                start_tag, done_tag = " (infinite)", ""
+            else:
+                loop_numbers = range(1, self.loop_count + 1)
+                start_tag = done_tag = f" of {self.loop_count}"
+            waypoints = self.route['waypoints']
+
+            for loop_number in loop_numbers:
+                if self.stop_requested:
+                    break
+                self.current_loop = loop_number
+                logger.info("Starting loop %d%s", loop_number, start_tag)
                 
                 # Execute all waypoints in this loop
-                while not self.stop_requested and self.current_waypoint_index < self.total_waypoints:
-                    # Check if paused
-                    if self.is_paused:
-                        time.sleep(0.5)
-                        continue
+                for idx in range(self.total_waypoints):
+                    # Block while paused
+                    while self.is_paused and not self.stop_requested:
+                        self.not_paused.wait()
+                    if self.stop_requested:
+                        break
                     
                     # Get current waypoint
-                    waypoint = self.route['waypoints'][self.current_waypoint_index]
+                    self.current_waypoint_index = idx
+                    waypoint = waypoints[idx]
                     self.current_waypoint = waypoint
                     
                     # Execute waypoint
@@ -239,40 +338,31 @@ class PatrolManager:
                     self._wait_for_waypoint_completion(waypoint)
                     
                     # Move to next waypoint
-                    self.current_waypoint_index += 1
+                    self.current_waypoint_index = idx + 1
                     self._emit_status_update()
                 
                 # Loop completed
                 if not self.stop_requested:
-                    logger.info(f"Completed loop {self.current_loop}" + 
-                              (f" of {self.loop_count}" if not self.is_infinite_loop else ""))
-                    
-                    # Check if we should continue looping
-                    if self.is_infinite_loop:
-                        keep_looping = True
-                        self.current_loop += 1
-                    else:
-                        self.current_loop += 1
-                        keep_looping = self.current_loop <= self.loop_count
+                    logger.info("Completed loop %d%s", loop_number, done_tag)
                 
             # Patrol complete
             if not self.stop_requested:
                 self._return_to_location("route_complete")
-                self.state = PatrolState.IDLE
+                self._transition(_STOPPABLE_STATES - {PatrolState.ERROR}, PatrolState.IDLE)
                 self._emit_complete()
                 logger.info(f"Patrol completed for robot {self.robot_id}")
             
         except Exception as e:
             logger.error(f"Error in patrol loop: {e}")
-            self.state = PatrolState.ERROR
+            self._transition(_STOPPABLE_STATES, PatrolState.ERROR)
             self._emit_error(str(e))
     
     def _execute_waypoint(self, waypoint: Dict):
         """Execute actions for a waypoint"""
         waypoint_name = waypoint['waypoint_name']
         
-        logger.info(f"Executing waypoint: {waypoint_name}")
-        patrolling_url = self.settings.get('patrolling_webview_url')
+        logger.info("Executing waypoint: %s", waypoint_name)
+        patrolling_url = self.patrolling_webview_url
         if patrolling_url:
             try:
                 self._show_webview_with_autoclose(patrolling_url)
@@ -280,24 +370,21 @@ class PatrolManager:
                 logger.error(f"Failed to show patrolling webview: {exc}")
         
         # Send goto command
-        self.mqtt_client.goto_waypoint(waypoint_name)
+        # Flag first, so a fast arrival event cannot be overwritten afterwards
         self.waiting_for_arrival = True
+        self.arrival_event.clear()
+        self.mqtt_client.goto_waypoint(waypoint_name)
         self.last_goto_time = time.time()
         
-        self.state = PatrolState.WAITING
+        # Don't overwrite a pause/stop that landed while the goto was being sent
+        self._transition({PatrolState.RUNNING, PatrolState.WAITING}, PatrolState.WAITING)
         self._emit_status_update()
 
     def _auto_close_webview(self, close_delay: Optional[int] = None):
         """Close webview after delay using waypoint or global default."""
-        try:
-            delay = int(close_delay) if close_delay is not None else 0
-        except (TypeError, ValueError):
-            delay = 0
+        delay = _as_int(close_delay, 0)
         if delay <= 0:
-            try:
-                delay = int(self.settings.get('webview_close_delay_seconds', 0))
-            except (TypeError, ValueError):
-                delay = 0
+            delay = self.webview_close_delay
         if delay > 0:
             logger.info(f"[ACTION] Closing webview after {delay} seconds")
             time.sleep(delay)
@@ -312,33 +399,41 @@ class PatrolManager:
     
     def _wait_for_waypoint_completion(self, waypoint: Dict):
         """Wait for waypoint arrival and execute actions with timeout and retry"""
-        timeout = int(self.settings.get('waypoint_timeout', 60))  # Configurable timeout
-        max_retries = int(self.settings.get('waypoint_max_retries', 2))
+        timeout = self.waypoint_timeout
+        max_retries = self.waypoint_max_retries
         retry_count = 0
         waypoint_name = waypoint['waypoint_name']
         
         while retry_count <= max_retries:
-            start_time = time.time()
+            start_time = time.monotonic()
+            next_log_at = start_time + 10.0
             
             # Wait for arrival
             while self.waiting_for_arrival and not self.stop_requested:
                 if self.is_paused:
-                    time.sleep(0.5)
-                    start_time += 0.5
+                    # Time spent paused does not count towards the timeout
+                    paused_at = time.monotonic()
+                    self.not_paused.wait()
+                    paused_for = time.monotonic() - paused_at
+                    start_time += paused_for
+                    next_log_at += paused_for
                     continue
-                elapsed = time.time() - start_time
+                now = time.monotonic()
+                elapsed = now - start_time
                 
                 # Log progress every 10 seconds
-                if int(elapsed) % 10 == 0 and int(elapsed) > 0:
-                    logger.info(f"Waiting for waypoint '{waypoint_name}' arrival... ({int(elapsed)}s elapsed)")
+                if now >= next_log_at:
+                    logger.info("Waiting for waypoint '%s' arrival... (%ds elapsed)", waypoint_name, elapsed)
+                    next_log_at += 10.0
                 
-                if elapsed > timeout:
+                if elapsed >= timeout:
                     if retry_count < max_retries:
-                        logger.warning(f"Timeout waiting for waypoint '{waypoint_name}'. Retry {retry_count + 1}/{max_retries}")
+                        logger.warning("Timeout waiting for waypoint '%s'. Retry %d/%d", waypoint_name, retry_count + 1, max_retries)
                         retry_count += 1
                         # Resend goto command
-                        self.mqtt_client.goto_waypoint(waypoint_name)
                         self.waiting_for_arrival = True
+                        self.arrival_event.clear()
+                        self.mqtt_client.goto_waypoint(waypoint_name)
                         break
                     else:
                         logger.error(f"Timeout waiting for waypoint '{waypoint_name}' after {max_retries} retries")
@@ -346,7 +441,9 @@ class PatrolManager:
                         self.waiting_for_arrival = False
                         return
                 
-                time.sleep(0.5)
+                # Sleep until arrival, pause/stop, the timeout or the next progress log
+                self.arrival_event.wait(min(start_time + timeout, next_log_at) - now)
+                self.arrival_event.clear()
             
             # If arrived or stopped, break retry loop
             if not self.waiting_for_arrival or self.stop_requested:
@@ -362,12 +459,12 @@ class PatrolManager:
         if self.return_after_current:
             logger.warning("Low battery return triggered after current waypoint")
             self._return_to_location("low_battery_complete")
-            self.stop_requested = True
+            self._request_stop()
     
     def _on_waypoint_arrival(self):
         """Called when robot arrives at waypoint"""
         if self.current_waypoint:
-            logger.info(f"Arrived at waypoint: {self.current_waypoint['waypoint_name']}")
+            logger.info("Arrived at waypoint: %s", self.current_waypoint['waypoint_name'])
             
             if self.on_waypoint_reached:
                 self.on_waypoint_reached(
@@ -379,21 +476,12 @@ class PatrolManager:
     def _execute_waypoint_actions(self, waypoint: Dict):
         """Execute display and TTS actions at waypoint"""
         waypoint_name = waypoint.get('waypoint_name')
-        try:
-            tts_wait_seconds = int(self.settings.get('tts_wait_seconds', 3))
-        except (TypeError, ValueError):
-            tts_wait_seconds = 3
-        try:
-            display_wait_seconds = int(self.settings.get('display_wait_seconds', 2))
-        except (TypeError, ValueError):
-            display_wait_seconds = 2
-        try:
-            arrival_delay = int(self.settings.get('arrival_action_delay_seconds', 2))
-        except (TypeError, ValueError):
-            arrival_delay = 2
+        mqtt = self.mqtt_client
+        tts_wait_seconds = self.tts_wait_seconds
+        display_wait_seconds = self.display_wait_seconds
 
-        if arrival_delay > 0:
-            time.sleep(arrival_delay)
+        if self.arrival_delay > 0:
+            time.sleep(self.arrival_delay)
 
         if waypoint.get('detection_enabled'):
             self._run_detection_gate(waypoint)
@@ -401,8 +489,8 @@ class PatrolManager:
         # Execute TTS action first (before display)
         tts_message = waypoint.get('tts_message')
         if tts_message:
-            logger.info(f"[ACTION] Speaking TTS at '{waypoint_name}': {tts_message}")
-            success = self.mqtt_client.speak_tts(tts_message)
+            logger.info("[ACTION] Speaking TTS at '%s': %s", waypoint_name, tts_message)
+            success = mqtt.speak_tts(tts_message)
             if success:
                 logger.info("[ACTION] OK TTS command sent successfully")
             else:
@@ -415,35 +503,21 @@ class PatrolManager:
         display_content = waypoint.get('display_content')
         
         if display_type and display_content:
-            logger.info(f"[ACTION] Displaying {display_type} at '{waypoint_name}': {display_content}")
+            logger.info("[ACTION] Displaying %s at '%s': %s", display_type, waypoint_name, display_content)
             success = False
             
             if display_type == 'text':
-                # Create HTML for text display
-                html_content = f"""
-                <html>
-                <head><meta charset="UTF-8"></head>
-                <body style='display:flex;justify-content:center;align-items:center;
-                           height:100vh;font-size:48px;text-align:center;
-                           background-color:#000;color:#fff;padding:20px;'>
-                    {display_content}
-                </body>
-                </html>
-                """
                 # Use data URI for immediate display
-                import base64
-                encoded = base64.b64encode(html_content.encode()).decode()
-                data_uri = f"data:text/html;base64,{encoded}"
-                success = self.mqtt_client.show_webview(data_uri)
+                success = mqtt.show_webview(_text_display_data_uri(display_content))
                 
             elif display_type == 'image':
-                success = self.mqtt_client.show_image(display_content)
+                success = mqtt.show_image(display_content)
                 
             elif display_type == 'webview':
-                success = self.mqtt_client.show_webview(display_content)
+                success = mqtt.show_webview(display_content)
 
             elif display_type == 'video':
-                success = self.mqtt_client.play_video(display_content)
+                success = mqtt.play_video(display_content)
             
             if success:
                 logger.info("[ACTION] OK display command sent successfully")
@@ -453,24 +527,16 @@ class PatrolManager:
                 time.sleep(display_wait_seconds)
 
             if display_type == 'webview' and success:
-                try:
-                    close_delay = waypoint.get('webview_close_delay')
-                    close_delay = int(close_delay) if close_delay is not None else 0
-                except (TypeError, ValueError):
-                    close_delay = 0
-                self._auto_close_webview(close_delay)
+                self._auto_close_webview(waypoint.get('webview_close_delay'))
         
         # Dwell time at waypoint
         dwell_time = waypoint.get('dwell_time', 5)
         if dwell_time > 0:
-            logger.info(f"[ACTION] Dwelling at waypoint for {dwell_time} seconds")
+            logger.info("[ACTION] Dwelling at waypoint for %s seconds", dwell_time)
             
             # Wait with ability to stop
-            for i in range(int(dwell_time * 2)):  # Check every 0.5 seconds
-                if self.stop_requested:
-                    logger.info("[ACTION] Dwell interrupted by stop request")
-                    break
-                time.sleep(0.5)
+            if self.stop_event.wait(dwell_time):
+                logger.info("[ACTION] Dwell interrupted by stop request")
 
     def _get_yolo_snapshot(self) -> Dict[str, Any]:
         """Get a snapshot of the latest YOLO state"""
@@ -483,8 +549,9 @@ class PatrolManager:
             logger.error(f"Failed to fetch YOLO snapshot: {exc}")
             return {}
 
-    def _extract_violation_counts(self, snapshot: Dict[str, Any]) -> Dict[str, Any]:
-        """Extract violation counts from a YOLO snapshot"""
+    def _extract_violation_counts(self, snapshot: Dict[str, Any],
+                                  with_payload: bool = False) -> Dict[str, Any]:
+        """Extract violation counts from a YOLO snapshot (raw payload only if requested)"""
         yolo_payload = snapshot.get('yolo_payload') if isinstance(snapshot, dict) else {}
         total_violations = snapshot.get('total_violations')
         total_people = snapshot.get('total_people')
@@ -515,13 +582,15 @@ class PatrolManager:
         except (TypeError, ValueError):
             total_compliant = 0
 
-        return {
+        counts = {
             'total_violations': total_violations,
             'total_people': total_people,
             'total_compliant': total_compliant,
-            'viewports': viewports if isinstance(viewports, dict) else {},
-            'yolo_payload': yolo_payload if isinstance(yolo_payload, dict) else {}
+            'viewports': viewports if isinstance(viewports, dict) else {}
         }
+        if with_payload:
+            counts['yolo_payload'] = yolo_payload if isinstance(yolo_payload, dict) else {}
+        return counts
 
     def _execute_violation_action(self, action: str, waypoint: Dict) -> Optional[str]:
         """Execute a violation response action"""
@@ -533,7 +602,7 @@ class PatrolManager:
                 'violation_tts_default',
                 'Please follow safety protocols and wear proper PPE.'
             )
-            logger.info(f"[DETECTION] Speaking violation TTS: {message}")
+            logger.info("[DETECTION] Speaking violation TTS: %s", message)
             success = self.mqtt_client.speak_tts(message)
             return 'tts_ok' if success else 'tts_failed'
 
@@ -545,15 +614,10 @@ class PatrolManager:
                 url = self.settings.get('violation_display_content_default', '')
             if not url:
                 return 'webview_skipped'
-            logger.info(f"[DETECTION] Showing violation webview: {url}")
+            logger.info("[DETECTION] Showing violation webview: %s", url)
             success = self.mqtt_client.show_webview(url)
             if success:
-                try:
-                    close_delay = waypoint.get('webview_close_delay')
-                    close_delay = int(close_delay) if close_delay is not None else 0
-                except (TypeError, ValueError):
-                    close_delay = 0
-                self._auto_close_webview(close_delay)
+                self._auto_close_webview(waypoint.get('webview_close_delay'))
             return 'webview_ok' if success else 'webview_failed'
 
         if action == 'video':
@@ -564,7 +628,7 @@ class PatrolManager:
                 url = self.settings.get('violation_display_content_default', '')
             if not url:
                 return 'video_skipped'
-            logger.info(f"[DETECTION] Playing violation video: {url}")
+            logger.info("[DETECTION] Playing violation video: %s", url)
             success = self.mqtt_client.play_video(url)
             return 'video_ok' if success else 'video_failed'
 
@@ -573,39 +637,29 @@ class PatrolManager:
     def _run_detection_gate(self, waypoint: Dict):
         """Wait for YOLO checks at waypoint and trigger violation action if needed"""
         waypoint_name = waypoint.get('waypoint_name')
-        timeout = waypoint.get('detection_timeout')
-        no_violation_seconds = waypoint.get('no_violation_seconds')
-
-        if timeout is None:
-            timeout = self.settings.get('detection_timeout_seconds', 30)
-        if no_violation_seconds is None:
-            no_violation_seconds = self.settings.get('no_violation_seconds', 5)
-
-        try:
-            timeout = int(timeout)
-        except (TypeError, ValueError):
-            timeout = 30
-        try:
-            no_violation_seconds = int(no_violation_seconds)
-        except (TypeError, ValueError):
-            no_violation_seconds = 5
+        timeout = _as_int(waypoint.get('detection_timeout'), self.detection_timeout)
+        no_violation_seconds = _as_int(waypoint.get('no_violation_seconds'),
+                                       self.no_violation_seconds)
 
         action = waypoint.get('violation_action') or self.settings.get('violation_action_default', 'tts')
-        logger.info(f"[DETECTION] Monitoring at '{waypoint_name}' for up to {timeout}s")
+        logger.info("[DETECTION] Monitoring at '%s' for up to %ss", waypoint_name, timeout)
 
-        start_time = time.time()
+        start_time = time.monotonic()
         no_violation_start = None
-        last_snapshot = None
         last_counts = None
+        counts_message_time = None
         action_taken = None
         violations_seen = False
 
         while not self.stop_requested:
             snapshot = self._get_yolo_snapshot()
-            if snapshot:
-                last_snapshot = snapshot
-            counts = self._extract_violation_counts(snapshot)
-            last_counts = counts
+            # Counts only change when a new YOLO message arrives, so reuse the
+            # previous extraction while last_message_time is unchanged
+            message_time = snapshot.get('last_message_time')
+            if last_counts is None or message_time is None or message_time != counts_message_time:
+                last_counts = self._extract_violation_counts(snapshot)
+                counts_message_time = message_time
+            counts = last_counts
             total_violations = counts['total_violations']
 
             if total_violations > 0:
@@ -615,36 +669,35 @@ class PatrolManager:
                     action_taken = self._execute_violation_action(action, waypoint)
             else:
                 if no_violation_start is None:
-                    no_violation_start = time.time()
-                if no_violation_seconds <= 0 or (time.time() - no_violation_start) >= no_violation_seconds:
+                    no_violation_start = time.monotonic()
+                if no_violation_seconds <= 0 or (time.monotonic() - no_violation_start) >= no_violation_seconds:
                     break
 
-            if (time.time() - start_time) >= timeout:
+            if (time.monotonic() - start_time) >= timeout:
                 break
 
             time.sleep(0.5)
 
-        summary = self._build_waypoint_summary(last_snapshot, last_counts)
+        # Only the counts are kept while polling; the raw payload for the
+        # summary comes from one last snapshot
+        final_snapshot = self._get_yolo_snapshot()
+        summary = self._build_waypoint_summary(final_snapshot, None if final_snapshot else last_counts)
         notes = None
         if violations_seen:
             notes = "violations_detected"
-        if (time.time() - start_time) >= timeout:
+        if (time.monotonic() - start_time) >= timeout:
             notes = "timeout" if not notes else f"{notes},timeout"
 
         if not violations_seen and not self.stop_requested:
-            no_violation_url = self.settings.get('no_violation_webview_url')
+            no_violation_url = self.no_violation_webview_url
             if no_violation_url:
                 try:
                     self._show_webview_with_autoclose(no_violation_url)
                 except Exception as exc:
                     logger.error(f"Failed to show no-violation webview: {exc}")
-                try:
-                    display_wait_seconds = int(self.settings.get('display_wait_seconds', 2))
-                except (TypeError, ValueError):
-                    display_wait_seconds = 2
-                if display_wait_seconds > 0:
-                    time.sleep(display_wait_seconds)
-            no_violation_tts = self.settings.get('no_violation_tts')
+                if self.display_wait_seconds > 0:
+                    time.sleep(self.display_wait_seconds)
+            no_violation_tts = self.no_violation_tts
             if no_violation_tts:
                 self.mqtt_client.speak_tts(no_violation_tts)
 
@@ -658,7 +711,7 @@ class PatrolManager:
                                 counts: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Build summary payload for waypoint logging"""
         if counts is None:
-            counts = self._extract_violation_counts(snapshot or {})
+            counts = self._extract_violation_counts(snapshot or {}, with_payload=True)
         return {
             'timestamp': datetime.now().isoformat(),
             'total_people': counts.get('total_people', 0),
@@ -672,10 +725,11 @@ class PatrolManager:
         """Handle low battery situation"""
         logger.warning(f"Low battery detected: {self.current_battery_level}%")
         
-        self.state = PatrolState.LOW_BATTERY
+        self._transition({PatrolState.RUNNING, PatrolState.WAITING, PatrolState.PAUSED},
+                         PatrolState.LOW_BATTERY)
         self._emit_status_update()
 
-        low_battery_url = self.settings.get('low_battery_webview_url') or ''
+        low_battery_url = self.low_battery_webview_url
         if low_battery_url:
             try:
                 logger.info(f"[LOW BATTERY] Showing webview: {low_battery_url}")
@@ -685,7 +739,7 @@ class PatrolManager:
         
         if self.low_battery_action == 'stop_immediately':
             # Stop immediately and go to home base
-            self.stop_requested = True
+            self._request_stop()
             self.mqtt_client.stop_movement()
             time.sleep(1)
             self._return_to_location("low_battery_immediate")